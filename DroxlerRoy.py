@@ -31,12 +31,20 @@
 
     Nous avons préféré opter pour une génération de la population totalement aléatoire.
 
+    Sur les grandes instances, la majeure partie du temps était cependant passée à
+    défaire des chemins de départ aléatoires. Une partie de la population initiale
+    (seeding_rate, 25% par défaut) est donc maintenant construite par des heuristiques :
+    plus proche voisin (via un index spatial en grille), arêtes gloutonnes et courbe
+    de Hilbert, avec des variantes aléatoires pour garder de la diversité.
+
     ***********************************************************************************
                                         Selection
     ***********************************************************************************
 
-    Nous avons choisi de privilégier une selection élitiste, très simple et très rapide
-    implémentée par une simple list comprehension.
+    Nous avons choisi de privilégier une selection élitiste, très simple et très rapide.
+    Elle ne trie plus toute la population : heapq.nsmallest ne garde que les x% meilleurs,
+    en O(n log k). Une selection par tournoi, qui évite tout tri, est aussi disponible
+    (selection_method = "tournament").
 
     ***********************************************************************************
                                         Croisements
@@ -51,6 +59,13 @@
     en trouvant une méthode d'implémentation rapide via des rotations. Elle est
     précisément décrite dans la méthode ox_cross.
 
+    Un portefeuille de croisements est aussi disponible (crossover = "portfolio") : ox sur
+    une fenêtre au hasard, pmx et recombinaison d'arêtes s'ajoutent à l'ox habituel, et
+    les enfants sont répartis selon le gain que chaque croisement a récemment apporté par
+    seconde de calcul. Sur nos instances, les croisements ne produisent presque plus
+    d'enfants utiles une fois la population homogène, c'est la mutation qui fait le
+    travail ; l'ox reste donc le croisement par défaut.
+
     ***********************************************************************************
                                         Mutations
     ***********************************************************************************
@@ -76,12 +91,15 @@
     il est utile de mettre un taux de mutation plus élevé que les 30% que l'on retrouve
     dans la documentation scientifique du domaine.
 
-    Les paramètres ne sont pas encore totalement optimisés par manque de temps.
+    Les paramètres ne sont pas encore totalement optimisés par manque de temps. Le script
+    tuning.py les mesure par classe de taille d'instance (successive halving sur les
+    instances de data/), et écrit un profil que ga_solve peut charger (voir load_profile).
 
     L'utilisation en tant que module a été testée avec le PVC-tester-3.5, et il n'a
-    pas fourni d'erreur. On pourrait tenter de réduire la constante TIMELIMIT qui fixe
-    le temps qu'il faut laisser pour l'aggrégation des résultat et le retour des
-    méthodes, mais on risque de fournir des timeout pour le testeur.
+    pas fourni d'erreur. La constante TIMELIMIT fixe le temps qu'il faut laisser pour
+    l'aggrégation des résultat et le retour des méthodes. Le temps est géré par
+    TimeBudget, qui mesure la durée des générations pour ne lancer que celles qui
+    peuvent se terminer avant la fin du temps imparti.
 
     ***********************************************************************************
                                         Conclusions
@@ -127,6 +145,11 @@
       La deuxième est beaucoup plus intéressant mais allourdi énormément la boucle
       principale de l'algorithme.
 
+      C'est maintenant fait de manière peu coûteuse (mode adaptive) : toutes les
+      DIVERSITYINTERVAL générations, on compte les arêtes communes à deux chromosomes
+      tirés au hasard, et cette mesure lissée sert à renforcer les mutations quand la
+      population est trop homogène, puis à arrêter la recherche quand elle a convergé.
+
     ***********************************************************************************
                               Améliorations et perspectives
     ***********************************************************************************
@@ -152,113 +175,296 @@
 
 """
 
-import pygame
-from pygame.locals import *
-from pygame.math import Vector2
-from itertools import cycle
+from array import array
 import sys, getopt
+import os
+import mmap
+import struct
+import zlib
+import hashlib
+import tempfile
 import random
-from math import sqrt
-from time import time
-from math import hypot
-
-# Contient le tableau de villes. Une fois instancié, il n'est plus modifié.
-# Il est global pour éviter de le passer à chaque méthode, ce qui impacte
-# légèrement les performances
-cities = None
+import multiprocessing
+import queue
+import csv
+import json
+import heapq
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from time import time, perf_counter
+from math import hypot, sqrt, ceil
+
+# NumPy est facultatif : s'il est disponible, les coûts des nouveaux chromosomes
+# sont évalués en une seule opération vectorisée pour toute la génération, et les
+# matrices des distances sont calculées par blocs de lignes. Son import prenant
+# plus de temps que celui de tout le reste du module, il n'est fait qu'à la première
+# utilisation (voir load_numpy) : False tant qu'il n'a pas été tenté, None s'il a échoué.
+numpy = False
+
+def load_numpy():
+    """Module NumPy, importé à la première utilisation ; None s'il n'est pas disponible"""
+    global numpy
+    if numpy is False:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy = module
+    return numpy
+
+# Paramètres par défaut de l'algorithme, repris par chaque Solver à sa création.
+# Ils ne sont jamais modifiés pendant une résolution.
 # Nombre de chromosomes formant la population
 population_size = 20
 # Pourcentage de la population qui va subir une mutation
 mutation_rate = 40
 # Pourcentage des chromosomes gardés lors de la phase de selection
 selection_rate = 60
-
-# Sert à l'enregistrement du temps lors de l'appel comme module
-starting_time = 0
-
-# Constantes pour PyGame
-WHITE = (255,255,255)
-RED = (255,0,0)
-BLACK = (0,0,0)
-
-# Taille des points pour représenter les villes
-POINTSIZE = 5
-# Temps que l'on laisse à disposition pour retourner la solution. Avec 0.05s on est très très large, cela prend en général 0.005s
-TIMELIMIT = 0.05
+# Second seuil de mutation pour tenter de faire sortir d'un minimum local
+second_mutation_rate = 60
+# Pourcentage de la population initiale construit par des heuristiques (plus proche
+# voisin, arêtes gloutonnes, courbe de Hilbert), le reste étant aléatoire
+seeding_rate = 25
+# Méthode de selection : "elitist" (les meilleurs) ou "tournament" (par tournois)
+selection_method = "elitist"
+# Taille maximale du cache des coûts (nombre de chemins), 0 pour le désactiver
+fitness_cache_size = 10000
+# Suppression des chromosomes en double (au sens du chemin) avant chaque selection
+deduplicate = False
+# Adaptation du taux de mutation et arrêt anticipé selon la diversité de la population
+adaptive = True
+# Paramètres réglés par le script tuning.py et enregistrés dans les profils
+TUNABLEPARAMETERS = ("population_size", "mutation_rate", "selection_rate", "second_mutation_rate")
+# Croisement : "ox" (croisement ox sur la moitié centrale des gênes) ou "portfolio"
+# (plusieurs croisements, choisis selon leur rendement récent, voir OperatorPortfolio)
+crossover = "ox"
+
+# Temps que l'on laisse à disposition pour retourner la solution, cela prend en général 0.005s.
+# La durée des générations est mesurée par TimeBudget, cette réserve n'a donc plus besoin
+# de couvrir une génération entière comme avec l'ancienne marge fixe de 0.05s
+TIMELIMIT = 0.01
+# Le temps restant est vérifié environ toutes les CHECKPERIOD secondes, et une nouvelle
+# génération n'est lancée que s'il reste au moins GENERATIONSAFETY fois sa durée estimée
+CHECKPERIOD = 0.005
+GENERATIONSAFETY = 2
 # Temps laissé à l'Algorithme par défaut si aucun paramètre n'est passé.
 DEFAULTMAXTIME = 20
 
+# Modèle en îles : nombre de générations entre deux migrations, et nombre de meilleurs
+# chromosomes envoyés à l'île voisine lors de chaque migration
+MIGRATIONINTERVAL = 50
+MIGRANTSNUMBER = 2
+# Temps réservé par le processus principal pour récupérer les résultats des îles
+ISLANDTIMELIMIT = 0.1
+
 # Nombre d'itérations qui lorsqu'elles aboutissent au même résultat coupe la recherche
 # Il est volontairement très élevé car l'algorithme génère beaucoup de bruit via son aléatoire
 MAXSAMESOLUTIONNUMBER = 5000
 
+# Mode mémétique : nombre de meilleurs chromosomes améliorés par recherche locale
+# après chaque selection, et nombre de plus proches voisins considérés pour chaque
+# ville par le 2-opt et l'Or-opt
+LOCALSEARCHELITES = 2
+NEIGHBOURSNUMBER = 8
+# Longueur maximale des portions déplacées par l'Or-opt
+OROPTLENGTH = 3
+# Tolérance sur les gains, pour ne pas boucler sur des erreurs d'arrondi
+EPSILON = 1e-9
+
+# Estimation de la diversité : une paire de chromosomes est comparée toutes les
+# DIVERSITYINTERVAL générations, et la mesure est lissée (moyenne mobile exponentielle)
+DIVERSITYINTERVAL = 10
+DIVERSITYSMOOTHING = 0.2
+# Sous DIVERSITYLOW, on passe au second taux de mutation pour relancer l'exploration.
+# Sous CONVERGENCEDIVERSITY, si le meilleur coût stagne depuis CONVERGENCESTAGNATION
+# générations (et au moins CONVERGENCESTAGNATIONPERCITY par ville), la population a
+# convergé et on s'arrête.
+DIVERSITYLOW = 0.1
+CONVERGENCEDIVERSITY = 0.02
+CONVERGENCESTAGNATION = 500
+CONVERGENCESTAGNATIONPERCITY = 20
+
+# Nombre de chromosomes tirés au hasard pour chaque tournoi de la selection par tournoi
+TOURNAMENTSIZE = 3
+# Portefeuille de croisements : lissage (moyenne mobile exponentielle) du rendement de
+# chaque croisement, mesuré en gain de coût par seconde de calcul, et part minimale des
+# enfants laissée à chaque croisement pour continuer à mesurer son rendement
+PORTFOLIOSMOOTHING = 0.1
+PORTFOLIOMINSHARE = 0.1
+
+# Population initiale : bruit relatif appliqué aux longueurs des arêtes pour varier
+# les chemins gloutons, et côté de la grille utilisée par la courbe de Hilbert
+GREEDYNOISE = 0.1
+HILBERTORDER = 1024
+# Part maximale du temps imparti consacrée aux heuristiques de la population initiale :
+# au-delà, le reste de la population est aléatoire
+SEEDINGTIMESHARE = 0.25
+# Au-delà de FULLMATRIXLIMIT villes, la matrice des distances n'est plus calculée :
+# elle prendrait n*n*8 octets (3.2 Go pour 20000 villes), les distances sont alors
+# calculées à la demande à partir des coordonnées (voir LazyDistances)
+FULLMATRIXLIMIT = 3000
+# Nombre de lignes de la matrice des distances calculées à la fois avec NumPy
+MATRIXBLOCKROWS = 256
+# Nombre de paires de villes vérifiées pour reconnaître une matrice des distances calculée
+# à partir des positions (voir coordinate_metric)
+METRICSAMPLESIZE = 64
+# Fichier binaire associé à chaque fichier de villes (même nom suivi de SIDECAREXTENSION),
+# qui contient les noms, les coordonnées et, jusqu'à FULLMATRIXLIMIT villes, la matrice
+# des distances : toute matrice que le Solver construirait est ainsi calculée une seule
+# fois. Il est relu par projection en mémoire (mmap) lors des chargements suivants.
+SIDECAREXTENSION = ".bin"
+# En-tête du fichier binaire : signature, version, ordre des octets, présence de la matrice,
+# nombre de villes, taille de la table des noms, taille et date de modification du fichier
+# de villes (pour détecter un fichier binaire périmé)
+SIDECARHEADER = struct.Struct("=4sBBHIIqq")
+SIDECARMAGIC = b"DRVC"
+SIDECARVERSION = 2
+# Extension des fichiers d'instances au format TSPLIB
+TSPLIBEXTENSION = ".tsp"
+# Points de reprise : la population est enregistrée au plus toutes les CHECKPOINTINTERVAL
+# secondes, ainsi qu'à la fin de la résolution
+CHECKPOINTINTERVAL = 5
+# En-tête d'un point de reprise : signature, version, type des gênes, second seuil de
+# mutation atteint, nombre de villes, empreinte de l'instance, taille de la population,
+# génération, taux de mutation, diversité, dernier meilleur coût, puis état du générateur
+# aléatoire (version, présence et valeur de gauss_next)
+CHECKPOINTHEADER = struct.Struct("=4sBcBIIIIdddB?d")
+CHECKPOINTMAGIC = b"DRCK"
+CHECKPOINTVERSION = 2
+# Extension des fichiers de solutions du cache de résultats (voir ResultCache)
+RESULTCACHEEXTENSION = ".tour"
+
 ################################################################################
 #  Algorithme génétique
 ################################################################################
 
-def populate(count):
-    """Crée une population de n individus selon la liste de ville auparavant déterminée"""
-    population = []
-
-    available_indexes = []
-
-    # Pour chaque échantillon de la population à créer
-    for _ in range(0,count):
-        indexes_list = []
-
-        available_indexes = list(range(len(cities)))
-
-        # On utilise ici une liste d'index afin de minimiser les appels au random
-        # Tant qu'il reste encore des index (attention, ils ne sont pas forcément consécutifs)
-        while (len(available_indexes) > 0):
-            # On tire au hasard un index entre 0 et la longueur de la chaine
-            index = random.randrange(0, len(available_indexes))
-            # On ajoute la valeur contenue à l'index à la séquence de villes
-            indexes_list.append(available_indexes[index])
-            # On retire l'index de la ville
-            del available_indexes[index]
-        population.append(Chromosome(indexes_list))
-
-    return population
-
-def selection(population):
-    """Seleciton purement élitiste, volontairement afin de ne pas perdre de temps à sélectionner.
-    On se contente de trier et de selectionner les x% meilleurs.
-    Cela se couple avec la volonté des croisements et des selections de parcourir au maximum le
-    domaine de solution en favorisant le hasard, et le fait que les mutations créent des nouveaux chromosomes.
-    A la fin de la mutation, la population a une taille plus grande que la taille définie via la variable globale
-    population_size.
-    On se retrouve avec des chromosomes très différents, dans la population, ce qui implique que la selection
-    par roulette demanderai du temps pour en pas réellement améliorer le tirage.
-    """
-    population = sorted(population, key=lambda chromosome: chromosome.cost)
-    population = population[:(int)(len(population)/100 * selection_rate)]
-
-    return population
-
-def crossing(population, size):
-    """ Le croisement s'effectue via la méthode de croisement en deux points (ox).
-    Les deux chromosomes qui sont utilisés pour le croisement sont choisi aléatoirement.
-    La portion qui est réarrangée pour être réorganisée est toujours de la taille de la moitié
-    des gênes qui composent un chemin. On pourrait imaginer faire varier la longueur à chaque
-    croisement, mais il faut vérifier que ca apporte vraiment quelque chose.
-
-    """
-    start_ox_index = int(len(population[0].genes) / 2 - len(population[0].genes) / 4)
-    end_ox_index = int(len(population[0].genes) / 2 + len(population[0].genes) / 4)
-
-    nb_to_create = size - len(population)
-
-    for chromosome_index in range(0, nb_to_create):
-        chromosome_x = random.choice(population)
-        chromosome_y = random.choice(population)
-
-        new_genes_list = ox_cross(chromosome_x, chromosome_y, start_ox_index, end_ox_index)
-
-        # Ajout du nouveau chromosome à la population
-        population.append(Chromosome(new_genes_list))
-
-    return population
+def euc_2d(dx, dy):
+    """Distance EUC_2D de TSPLIB : distance euclidienne arrondie à l'entier le plus proche"""
+    return float(int(hypot(dx, dy) + 0.5))
+
+def ceil_2d(dx, dy):
+    """Distance CEIL_2D de TSPLIB : distance euclidienne arrondie à l'entier supérieur"""
+    return float(ceil(hypot(dx, dy)))
+
+def att(dx, dy):
+    """Distance pseudo-euclidienne ATT de TSPLIB"""
+    distance = sqrt((dx * dx + dy * dy) / 10.0)
+    rounded = int(distance + 0.5)
+    return float(rounded + 1 if rounded < distance else rounded)
+
+# Fonctions de distance, par nom. EUCLIDEAN (hypot, sans arrondi) est celle du PVC-tester
+METRICS = {"EUCLIDEAN": hypot, "EUC_2D": euc_2d, "CEIL_2D": ceil_2d, "ATT": att}
+
+def numpy_distances(dx, dy, metric):
+    """Version NumPy des fonctions de distance de METRICS : distances pour des tableaux
+    d'écarts dx et dy, arrondies comme le fait la fonction metric"""
+    numpy = load_numpy()
+    distance = numpy.hypot(dx, dy)
+    if metric == "EUC_2D":
+        distance = numpy.floor(distance + 0.5)
+    elif metric == "CEIL_2D":
+        distance = numpy.ceil(distance)
+    elif metric == "ATT":
+        distance = numpy.sqrt((dx * dx + dy * dy) / 10.0)
+        rounded = numpy.floor(distance + 0.5)
+        distance = rounded + (rounded < distance)
+    return distance
+
+def build_distance_matrix(cities_list, metric="EUCLIDEAN"):
+    """Calcul de la matrice des distances entre toutes les villes, selon la fonction de
+    distance metric (voir METRICS). La matrice est symétrique et stockée à plat dans un
+    array('d') de n*n éléments. Par défaut on utilise hypot, comme le PVC-tester.
+    La matrice est calculée avec NumPy s'il est disponible, par blocs de MATRIXBLOCKROWS
+    lignes pour limiter la mémoire temporaire. numpy.hypot pouvant différer de hypot sur
+    le dernier bit, le coût des solutions retournées est recalculé (voir exact_cost)."""
+    distance = METRICS[metric]
+    positions = [(city.pos[0], city.pos[1]) for city in cities_list]
+    matrix = array('d')
+
+    numpy = load_numpy()
+    if numpy is not None:
+        xs = numpy.array([x for x, y in positions], dtype=numpy.float64)
+        ys = numpy.array([y for x, y in positions], dtype=numpy.float64)
+        for start in range(0, len(positions), MATRIXBLOCKROWS):
+            end = start + MATRIXBLOCKROWS
+            block = numpy_distances(xs - xs[start:end, None], ys - ys[start:end, None], metric)
+            matrix.frombytes(block.tobytes())
+        return matrix
+
+    for x1, y1 in positions:
+        matrix.extend([distance(x2 - x1, y2 - y1) for x2, y2 in positions])
+
+    return matrix
+
+def exact_cost(cities_list, tour, cost):
+    """Coût du chemin tour (indices des villes) calculé avec hypot dans l'ordre du chemin,
+    exactement comme le PVC-tester, s'il ne diffère du coût cost obtenu avec la matrice
+    des distances que par des arrondis ; cost sinon (distances TSPLIB arrondies ou
+    EXPLICIT, qui ne se déduisent pas de hypot)"""
+    if not tour:
+        return cost
+    euclidean = 0
+    for index1, index2 in zip(tour, tour[1:] + tour[:1]):
+        (x1, y1), (x2, y2) = cities_list[index1].pos, cities_list[index2].pos
+        euclidean += hypot(x2 - x1, y2 - y1)
+    return euclidean if abs(euclidean - cost) <= EPSILON * max(cost, 1) else cost
+
+def coordinate_metric(cities_list, distances):
+    """Nom de la fonction de distance de METRICS qui donne la matrice distances à partir des
+    positions des villes, vérifiée sur METRICSAMPLESIZE paires tirées avec une graine fixe ;
+    None si aucune ne convient, la matrice ne se déduisant pas des positions (instance
+    TSPLIB EXPLICIT)"""
+    n = len(cities_list)
+    sample = random.Random(0)
+    pairs = [(sample.randrange(n), sample.randrange(n)) for _ in range(METRICSAMPLESIZE)] if n else []
+
+    for name, distance in METRICS.items():
+        for a, b in pairs:
+            (x1, y1), (x2, y2) = cities_list[a].pos, cities_list[b].pos
+            if abs(distance(x2 - x1, y2 - y1) - distances[a * n + b]) > EPSILON * max(distances[a * n + b], 1):
+                break
+        else:
+            return name
+    return None
+
+def distance_table(cities_list, metric="EUCLIDEAN"):
+    """Distances entre les villes : la matrice complète jusqu'à FULLMATRIXLIMIT villes,
+    un calcul à la demande (LazyDistances) au-delà. Les deux s'indexent de la même façon."""
+    if len(cities_list) <= FULLMATRIXLIMIT:
+        return build_distance_matrix(cities_list, metric)
+    return LazyDistances(cities_list, metric)
+
+def canonical_key(genes):
+    """Clé identifiant un chemin indépendamment de sa ville de départ et de son sens de
+    parcours : le chemin est tourné pour commencer par la ville 0, puis parcouru dans le
+    sens où la deuxième ville a le plus petit index. Toutes les opérations sont faites
+    sur l'array des gênes (en C), ce qui est bien plus rapide qu'une évaluation du coût."""
+    start = genes.index(0)
+    tour = genes[start:] + genes[:start]
+
+    if len(tour) > 2 and tour[1] > tour[-1]:
+        tour.reverse()
+        tour = tour[-1:] + tour[:-1]
+
+    return hash(tour.tobytes())
+
+def hilbert_index(order, x, y):
+    """Position du point (x, y) le long d'une courbe de Hilbert couvrant une grille de
+    order x order cases (order est une puissance de deux)"""
+    index = 0
+    side = order // 2
+    while side > 0:
+        rx = 1 if x & side else 0
+        ry = 1 if y & side else 0
+        index += side * side * ((3 * rx) ^ ry)
+        # Rotation du quadrant
+        if ry == 0:
+            if rx == 1:
+                x = order - 1 - x
+                y = order - 1 - y
+            x, y = y, x
+        side //= 2
+    return index
 
 def ox_cross(chromosome_x, chromosome_y, start_ox_index, end_ox_index):
     """ Principe global de mutation : Mutation ox.
@@ -299,189 +505,1727 @@ def ox_cross(chromosome_x, chromosome_y, start_ox_index, end_ox_index):
             Nouveaux gênes après croisements
             [7, 2, 0, 3, 5, 6, 1, 4, 9, 8]
 
+        Les marqueurs None ne sont pas réellement créés : un masque indexé par
+        la valeur des gênes indique ceux de la portion de y, et la rotation est
+        faite par une seule concaténation de slices. Le croisement est ainsi en
+        O(n) au lieu de O(n²).
+
     """
 
     # Détermination des valeurs à supprimer dans x, tirées de la portion y
-    list_to_replace = chromosome_y.genes[start_ox_index:end_ox_index+1]
+    list_to_insert = chromosome_y.genes[start_ox_index:end_ox_index+1]
 
-    # Remplacement de ces valeurs dans x avec des None
-    new_genes_list = [value if value not in list_to_replace else None for value in chromosome_x.genes]
+    # Masque d'appartenance à la portion de y : le test d'appartenance se fait
+    # en O(1) au lieu de parcourir la portion pour chaque gêne de x
+    replaced = bytearray(len(chromosome_x.genes))
+    for value in list_to_insert:
+        replaced[value] = 1
 
-    # Comptage du nombre de None à droite de la section (pour le décalage)
-    nb_none_right = new_genes_list[end_ox_index+1:].count(None)
+    # Comptage du nombre de marqueurs à droite de la section (pour le décalage)
+    nb_none_right = 0
+    for value in chromosome_x.genes[end_ox_index+1:]:
+        nb_none_right += replaced[value]
 
-    # Suppression des None dans la liste pour les rotations
-    new_genes_list = [value for value in new_genes_list if not value == None]
+    # Gênes de x sans les valeurs de la portion (équivalent à la suppression des None)
+    new_genes_list = [value for value in chromosome_x.genes if not replaced[value]]
 
-    # Rotation à droite des éléments
-    for _ in range(0,nb_none_right):
-        new_genes_list.insert(len(new_genes_list), new_genes_list.pop(0))
-    list_to_insert = chromosome_y.genes[start_ox_index:end_ox_index+1]
+    # Rotation des éléments en une seule opération de slices
+    if new_genes_list:
+        nb_none_right %= len(new_genes_list)
+        new_genes_list = new_genes_list[nb_none_right:] + new_genes_list[:nb_none_right]
 
     # Insertion des valeurs de y dans la section préparée
     new_genes_list[start_ox_index:start_ox_index] = list_to_insert
 
-    return new_genes_list
+    return array(chromosome_x.genes.typecode, new_genes_list)
+
+def random_window(random, nb_genes):
+    """Fenêtre [début, fin] tirée au hasard, pour les croisements à fenêtre variable"""
+    start, end = sorted(random.sample(range(nb_genes), 2)) if nb_genes > 1 else (0, 0)
+    return start, end
 
-def mutate(population):
-    """ Mutation appliquée sur la population. Les échantillons qui subissent une mutation
-        Sont choisis totalement au hasard. On fait muter un certain taux de la population.
-        Très important, les mutations crées de nouveaux échantillons pour la population,
-        on ne perd pas les chromosomes de base.
+def pmx_cross(chromosome_x, chromosome_y, start_index, end_index):
+    """ Croisement pmx (partially mapped crossover) : l'enfant reçoit la portion de y
+        entre start_index et end_index, à la même place, et garde les autres gênes de x.
+        Chaque gêne de y est amené à sa place par un échange avec la position qu'il
+        occupait dans l'enfant, ce qui suit les correspondances de la portion et garde
+        une permutation valide en O(n).
     """
-    for _ in range(0, int(len(population) / 100 * mutation_rate)):
-        chromosome = random.choice(population)
-        population.append(chromosome.mutate())
-
-    return population
-
-def solve(cities_list, window = None, maxtime = DEFAULTMAXTIME, gui = False):
-    """ Résolution du problème du voyageur commercial.
-        cities list est une liste de ville qui sera utilisée pour résoudre le problème.
-        Les autres paramètres sont facultatifs :
-        window est l'instance de la fenêtre PyGame.
-        maxtime est le temps total de calcul désiré, en seconde.
-        gui détermine si on désire le rendu graphique en temps réel
+    genes = chromosome_x.genes[:]
+    positions = [0] * len(genes)
+    for index, value in enumerate(genes):
+        positions[value] = index
+
+    for index in range(start_index, end_index + 1):
+        value = chromosome_y.genes[index]
+        other = positions[value]
+        displaced = genes[index]
+        genes[index], genes[other] = value, displaced
+        positions[value], positions[displaced] = index, other
+
+    return genes
+
+def erx_cross(chromosome_x, chromosome_y, random):
+    """ Croisement par recombinaison d'arêtes (edge recombination) : l'enfant est construit
+        ville par ville en suivant de préférence les arêtes présentes dans l'un des parents.
+        Parmi les voisins de la ville courante (dans x ou dans y), on choisit celui qui a
+        le moins de voisins restants, pour ne pas se retrouver isolé. Si la ville courante
+        n'a plus de voisin disponible, on repart d'une ville non visitée au hasard.
     """
-    global cities
-    global starting_time
-    global TIMELIMIT
-    global selection_rate
-    global mutation_rate
-
-    # Second seuil de mutation pour tenter de faire sortir d'un minimum local
-    second_mutation_rate = 60
-    # Détermine si on est dans le second seuil de mutation
-    augmentation_up = False
-    # Pourcentage d'erreur pour le calcul du temps écoulé entre deux cycles.
-    # Il est très grand pour ne pas prendre de risque pour l'évaluation via PVC-tester
-    time_error_rate = 0.02
-
-    stagnation = 0
-    old_best_cost = 0
-
-    if gui:
-        font = pygame.font.Font(None, 30)
-
-    # On fige volontairement la définition des villes en tuple, de manière globale
-    cities = tuple(cities_list)
-
-    # Création de la population
-    population = populate(population_size)
-
-    # Calcul du temps écoulé depuis le lancement du programme
-    elapsed_time = time() - starting_time
-    time_left = maxtime - elapsed_time
-    time_left -= time_left * time_error_rate
-
-    # Boucle principale de l'algorithme génétique
-    while time_left > TIMELIMIT and stagnation < MAXSAMESOLUTIONNUMBER:
-        time1 = time()
-        population = selection(population)
-
-        # A ce moment, la liste est triée car la selection vient de le faire
-        best_cost = population[0].cost
-
-        if best_cost == old_best_cost:
-            stagnation += 1
+    genes_x, genes_y = chromosome_x.genes, chromosome_y.genes
+    nb_genes = len(genes_x)
+    neighbours = [set() for _ in range(nb_genes)]
+    for genes in (genes_x, genes_y):
+        for city, following in zip(genes, genes[1:] + genes[:1]):
+            # Sur un chemin d'une seule ville, l'arête de retour relie la ville à elle-même
+            if city != following:
+                neighbours[city].add(following)
+                neighbours[following].add(city)
+
+    # Les villes de repli sont prises dans un ordre aléatoire, sans revenir en arrière
+    fallback = list(range(nb_genes))
+    random.shuffle(fallback)
+    fallback_index = 0
+    visited = bytearray(nb_genes)
+
+    city = genes_x[0]
+    tour = []
+    while True:
+        tour.append(city)
+        visited[city] = 1
+        for other in neighbours[city]:
+            neighbours[other].discard(city)
+        if len(tour) == nb_genes:
+            break
+
+        candidates = neighbours[city]
+        if candidates:
+            city = min(candidates, key=lambda other: len(neighbours[other]))
         else:
-            stagnation = 0
+            while visited[fallback[fallback_index]]:
+                fallback_index += 1
+            city = fallback[fallback_index]
+
+    return array(genes_x.typecode, tour)
+
+class Solver(object):
+    """ Résolution du problème du voyageur commercial pour un ensemble de villes.
+        Le Solver possède toutes les données de l'instance (villes, matrice des
+        distances), ses paramètres, son générateur aléatoire et son temps de départ.
+        Aucune variable globale n'est modifiée : plusieurs Solver peuvent tourner en
+        même temps dans des threads, et un même Solver peut être relancé.
+    """
+
+    def __init__(self, cities_list, population_size=None, mutation_rate=None,
+                 selection_rate=None, second_mutation_rate=None, seed=None, starting_time=None,
+                 local_search=False, seeding_rate=None, selection_method=None,
+                 fitness_cache_size=None, deduplicate=None, adaptive=None, distances=None,
+                 checkpoint=None, resume=None, initial_tours=None, crossover=None):
+        """ cities_list est la liste des villes à parcourir. Les paramètres non fournis
+            prennent les valeurs par défaut du module. seed initialise le générateur
+            aléatoire propre au Solver, starting_time est l'instant à partir duquel le
+            temps maxtime est décompté (par défaut, la création du Solver).
+            local_search active le mode mémétique : les meilleurs chromosomes sont
+            améliorés par 2-opt et Or-opt après chaque selection.
+            seeding_rate est le pourcentage de la population initiale construit par
+            des heuristiques plutôt qu'aléatoirement.
+            selection_method est "elitist" ou "tournament".
+            fitness_cache_size est la taille du cache des coûts (0 pour le désactiver),
+            deduplicate supprime les chemins en double avant chaque selection.
+            adaptive adapte le taux de mutation à la diversité de la population, et
+            arrête la recherche lorsque la population a convergé.
+            distances est la matrice des distances si elle est déjà connue, par exemple
+            lue depuis le fichier binaire d'une instance (voir load_instance).
+            checkpoint est le fichier où enregistrer régulièrement l'état de la résolution,
+            resume celui d'où la reprendre s'il existe (voir save_checkpoint).
+            initial_tours est une liste de chemins (listes d'indices des villes) placés
+            dans la population initiale, par exemple la meilleure solution déjà connue.
+            crossover est "ox" ou "portfolio" (voir crossing).
+        """
+        if starting_time is None:
+            starting_time = time()
+        self.starting_time = starting_time
+
+        # On fige volontairement la définition des villes en tuple
+        self.cities = tuple(cities_list)
+        self.nb_cities = len(self.cities)
+        # Type des éléments des arrays de gênes : 'H' (entiers non signés sur 16 bits)
+        # suffit jusqu'à 65535 villes, au-delà on passe sur 32 bits
+        self.genes_typecode = 'H' if self.nb_cities <= 0xFFFF else 'I'
+
+        # Matrice des distances entre les villes, stockée à plat (ligne par ligne) :
+        # la distance entre i et j est distances[i * nb_cities + j]. Elle est calculée
+        # une fois pour toutes, ou reprise telle quelle si elle est fournie. Sur les
+        # grandes instances, les distances sont calculées à la demande (voir distance_table)
+        self.distances = distances if distances is not None else distance_table(self.cities)
+        # Vue NumPy (n x n, sans copie) de la matrice des distances, créée à la première
+        # utilisation (voir numpy_matrix)
+        self.distances_matrix = None
+
+        self.population_size = population_size if population_size is not None else globals()['population_size']
+        self.mutation_rate = mutation_rate if mutation_rate is not None else globals()['mutation_rate']
+        self.selection_rate = selection_rate if selection_rate is not None else globals()['selection_rate']
+        self.second_mutation_rate = second_mutation_rate if second_mutation_rate is not None else globals()['second_mutation_rate']
+        self.seeding_rate = seeding_rate if seeding_rate is not None else globals()['seeding_rate']
+        self.selection_method = selection_method if selection_method is not None else globals()['selection_method']
+        if self.selection_method not in ("elitist", "tournament"):
+            raise ValueError("Méthode de selection inconnue : %s" % self.selection_method)
+        self.crossover = crossover if crossover is not None else globals()['crossover']
+        if self.crossover not in ("ox", "portfolio"):
+            raise ValueError("Croisement inconnu : %s" % self.crossover)
+        # Rendement des croisements, remis à zéro à chaque résolution
+        self.portfolio = None
+
+        if fitness_cache_size is None:
+            fitness_cache_size = globals()['fitness_cache_size']
+        # Cache des coûts des chemins déjà évalués, indexé par leur forme canonique
+        self.fitness_cache = FitnessCache(fitness_cache_size) if fitness_cache_size > 0 else None
+        self.deduplicate = deduplicate if deduplicate is not None else globals()['deduplicate']
+        self.adaptive = adaptive if adaptive is not None else globals()['adaptive']
+        # Estimation de la diversité de la population, remise à zéro à chaque résolution
+        self.diversity = None
+
+        self.random = random.Random(seed)
+
+        self.local_search = local_search
+        # Listes des plus proches voisins, calculées à la première recherche locale
+        self.neighbours = None
+
+        self.checkpoint = checkpoint
+        self.resume = resume
+        # Empreinte de l'instance, calculée au premier point de reprise (voir fingerprint)
+        self.instance_fingerprint = None
+        self.initial_tours = initial_tours or []
+
+        # Observateurs appelés à chaque génération avec un GenerationStats.
+        # Sans observateur, aucune mesure de temps supplémentaire n'est faite.
+        self.observers = []
+        self.instrumented = False
+        # Temps cumulé passé dans evaluate_batch, mesuré uniquement si instrumented
+        self.evaluation_time = 0
+
+    def add_observer(self, observer):
+        """Ajout d'un observateur, appelé à chaque génération avec un GenerationStats
+        (courbe de convergence et temps passé dans chaque phase)"""
+        self.observers.append(observer)
+
+    def notify(self, stats):
+        """Transmission des statistiques d'une génération aux observateurs"""
+        for observer in self.observers:
+            observer(stats)
+
+    def tour_cost(self, genes):
+        """Calcul du cout d'un chemin, ici la distance total vol d'oiseau
+        selon l'ordre des villes"""
+        # Ces quelques lignes sont un point critique des performance de l'algorithme.
+        # Les distances sont lues dans la matrice précalculée, ce qui évite de
+        # recalculer une racine carrée pour chaque arête de chaque nouveau chromosome.
+        matrix = self.distances
+        n = self.nb_cities
+
+        # Arête de retour entre la dernière et la première ville
+        distance = matrix[genes[-1] * n + genes[0]]
+
+        for index1, index2 in zip(genes, genes[1:]):
+            distance += matrix[index1 * n + index2]
+        return distance
+
+    def evaluate_batch(self, genes_lists):
+        """Calcul des coûts d'un lot de chemins. Avec NumPy, les chemins forment un tableau
+        2-D (nombre de chemins x nombre de villes) et toutes les arêtes sont lues dans la
+        matrice des distances puis sommées en une seule opération, ce qui évite le coût de
+        l'interpréteur par chromosome. Sans NumPy, on se rabat sur tour_cost."""
+        if not genes_lists:
+            return []
+
+        if self.instrumented:
+            start = perf_counter()
+            costs = self._evaluate_batch(genes_lists)
+            self.evaluation_time += perf_counter() - start
+            return costs
+
+        return self._evaluate_batch(genes_lists)
+
+    def _evaluate_batch(self, genes_lists):
+        """Calcul des coûts d'un lot de chemins, sans instrumentation. Les chemins déjà
+        présents dans le cache des coûts (à une rotation ou un sens de parcours près)
+        ne sont pas réévalués."""
+        cache = self.fitness_cache
+        if cache is None:
+            return self._compute_batch(genes_lists)
+
+        keys = [canonical_key(genes) for genes in genes_lists]
+        costs = [cache.get(key) for key in keys]
+        missing = [index for index, cost in enumerate(costs) if cost is None]
+
+        if missing:
+            computed = self._compute_batch([genes_lists[index] for index in missing])
+            for index, cost in zip(missing, computed):
+                costs[index] = cost
+                cache.put(keys[index], cost)
+
+        return costs
+
+    def numpy_matrix(self):
+        """Vue NumPy (n x n, sans copie) de la matrice des distances, None sans NumPy ou
+        si les distances sont calculées à la demande"""
+        if self.distances_matrix is None and not isinstance(self.distances, LazyDistances):
+            numpy = load_numpy()
+            if numpy is not None:
+                self.distances_matrix = numpy.frombuffer(self.distances, dtype=numpy.float64).reshape(self.nb_cities, self.nb_cities)
+        return self.distances_matrix
+
+    def _compute_batch(self, genes_lists):
+        """Calcul effectif des coûts d'un lot de chemins"""
+        if not genes_lists:
+            return []
+
+        numpy = load_numpy()
+        if numpy is None:
+            return [self.tour_cost(genes) for genes in genes_lists]
+
+        # Les gênes étant stockés dans des arrays compacts, le tableau 2-D est construit
+        # par simple concaténation des buffers
+        dtype = numpy.uint16 if self.genes_typecode == 'H' else numpy.uint32
+        offspring = numpy.frombuffer(b''.join(genes_lists), dtype=dtype).reshape(len(genes_lists), -1)
+        next_cities = numpy.roll(offspring, -1, axis=1)
+        matrix = self.numpy_matrix()
+        if matrix is None:
+            return self.distances.pairs(offspring, next_cities).sum(axis=1).tolist()
+        return matrix[offspring, next_cities].sum(axis=1).tolist()
+
+    def populate(self, count, deadline=None):
+        """Crée une population de n individus selon la liste de ville auparavant déterminée.
+        seeding_rate pourcents des individus sont construits par des heuristiques (voir
+        seed_tours) tant que l'échéance deadline (perf_counter) n'est pas atteinte, les
+        autres sont des permutations aléatoires. Les chemins initial_tours fournis au
+        Solver sont placés en tête."""
+        population = [array(self.genes_typecode, tour) for tour in self.initial_tours[:count]]
+        nb_seeded = max(int(count / 100 * self.seeding_rate) - len(population), 0)
+        population.extend(array(self.genes_typecode, tour) for tour in self.seed_tours(nb_seeded, deadline))
+
+        # Pour chaque échantillon aléatoire de la population à créer
+        for _ in range(len(population), count):
+            indexes_list = list(range(self.nb_cities))
+            # Mélange de Fisher-Yates, en O(n)
+            self.random.shuffle(indexes_list)
+            population.append(array(self.genes_typecode, indexes_list))
+
+        # Les coûts de toute la population initiale sont calculés en un seul lot
+        costs = self.evaluate_batch(population)
+
+        return [Chromosome(genes, cost) for genes, cost in zip(population, costs)]
+
+    def seed_tours(self, count, deadline=None):
+        """Construction de count chemins par des heuristiques, à tour de rôle : plus proche
+        voisin, arêtes gloutonnes et courbe de Hilbert. Le premier chemin de chaque
+        heuristique est déterministe, les suivants sont des variantes aléatoires (ville de
+        départ, bruit sur les arêtes, décalage de la courbe) pour garder de la diversité.
+        Aucun chemin n'est commencé après l'échéance deadline (perf_counter)."""
+        heuristics = (self.nearest_neighbour_tour, self.greedy_edge_tour, self.space_filling_curve_tour)
+        tours = []
+
+        if self.nb_cities < 3:
+            return tours
+
+        for index in range(count):
+            if deadline is not None and perf_counter() >= deadline:
+                break
+            heuristic = heuristics[index % len(heuristics)]
+            tours.append(heuristic(index >= len(heuristics)))
+
+        return tours
+
+    def nearest_neighbour_tour(self, randomized):
+        """Chemin du plus proche voisin, depuis la première ville ou depuis une ville au hasard.
+        La ville la plus proche non visitée est trouvée via un index spatial en grille."""
+        positions = [city.pos for city in self.cities]
+        current = self.random.randrange(self.nb_cities) if randomized else 0
+        grid = GridIndex(positions)
+        grid.remove(current)
+        tour = [current]
+
+        for _ in range(self.nb_cities - 1):
+            current = grid.nearest(*positions[current])
+            grid.remove(current)
+            tour.append(current)
+
+        return tour
+
+    def greedy_edge_tour(self, randomized):
+        """Chemin construit par arêtes gloutonnes : les arêtes candidates (vers les plus
+        proches voisins) sont ajoutées de la plus courte à la plus longue tant qu'elles ne
+        créent ni ville de degré 3 ni cycle. Les fragments obtenus sont ensuite reliés en
+        partant toujours vers l'extrémité libre la plus proche. Dans la variante aléatoire,
+        les longueurs sont perturbées d'au plus GREEDYNOISE."""
+        n = self.nb_cities
+        matrix = self.distances
+        neighbours = self.neighbour_lists()
+        noise = GREEDYNOISE if randomized else 0
+        uniform = self.random.random
+
+        edges = set()
+        for a in range(n):
+            for b in neighbours[a]:
+                edges.add((a, b) if a < b else (b, a))
+        edges = sorted(edges, key=lambda edge: matrix[edge[0] * n + edge[1]] * (1 + noise * uniform()))
+
+        # Union-find pour détecter les cycles, et liste d'adjacence des fragments
+        parent = list(range(n))
+        def find(city):
+            while parent[city] != city:
+                parent[city] = parent[parent[city]]
+                city = parent[city]
+            return city
+
+        adjacency = [[] for _ in range(n)]
+        for a, b in edges:
+            if len(adjacency[a]) < 2 and len(adjacency[b]) < 2:
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b:
+                    parent[root_a] = root_b
+                    adjacency[a].append(b)
+                    adjacency[b].append(a)
+
+        # Extraction des fragments (chemins) à partir de leurs extrémités
+        fragments = {}
+        visited = bytearray(n)
+        for city in range(n):
+            if len(adjacency[city]) < 2 and not visited[city]:
+                fragment = [city]
+                visited[city] = 1
+                previous, current = None, city
+                while True:
+                    following = [other for other in adjacency[current] if other != previous]
+                    if not following:
+                        break
+                    previous, current = current, following[0]
+                    visited[current] = 1
+                    fragment.append(current)
+                fragments[fragment[0]] = fragment
+                fragments[fragment[-1]] = fragment
+
+        # Liaison des fragments : on part toujours vers l'extrémité libre la plus proche
+        positions = [city.pos for city in self.cities]
+        grid = GridIndex(positions, fragments)
+        tour = fragments[next(iter(fragments))]
+        grid.remove(tour[0])
+        if tour[-1] != tour[0]:
+            grid.remove(tour[-1])
+        tour = list(tour)
+
+        while len(tour) < n:
+            end = grid.nearest(*positions[tour[-1]])
+            fragment = fragments[end]
+            grid.remove(fragment[0])
+            if fragment[-1] != fragment[0]:
+                grid.remove(fragment[-1])
+            tour.extend(fragment if fragment[0] == end else reversed(fragment))
+
+        return tour
+
+    def space_filling_curve_tour(self, randomized):
+        """Chemin qui visite les villes dans l'ordre d'une courbe de Hilbert couvrant la zone.
+        Dans la variante aléatoire, la grille de la courbe est décalée au hasard."""
+        xs = [city.pos[0] for city in self.cities]
+        ys = [city.pos[1] for city in self.cities]
+        min_x, min_y = min(xs), min(ys)
+        size = max(max(xs) - min_x, max(ys) - min_y, 1)
+        # Un décalage au hasard d'au plus une demi-zone donne une autre courbe
+        offset_x = self.random.uniform(0, size / 2) if randomized else 0
+        offset_y = self.random.uniform(0, size / 2) if randomized else 0
+        scale = (HILBERTORDER - 1) / (size * 1.5 if randomized else size)
+
+        keys = [hilbert_index(HILBERTORDER, int((x - min_x + offset_x) * scale), int((y - min_y + offset_y) * scale))
+                for x, y in zip(xs, ys)]
+        return sorted(range(self.nb_cities), key=keys.__getitem__)
+
+    def selection(self, population):
+        """Seleciton purement élitiste, volontairement afin de ne pas perdre de temps à sélectionner.
+        On se contente de trier et de selectionner les x% meilleurs.
+        Cela se couple avec la volonté des croisements et des selections de parcourir au maximum le
+        domaine de solution en favorisant le hasard, et le fait que les mutations créent des nouveaux chromosomes.
+        A la fin de la mutation, la population a une taille plus grande que la taille définie via
+        population_size.
+        On se retrouve avec des chromosomes très différents, dans la population, ce qui implique que la selection
+        par roulette demanderai du temps pour en pas réellement améliorer le tirage.
+        Seuls les x% meilleurs sont triés, via heapq.nsmallest, plutôt que toute la population.
+        Avec selection_method = "tournament", on délègue à tournament_selection.
+        Dans les deux cas, le meilleur chromosome est en tête de la population retournée.
+        """
+        # On garde toujours au moins un chromosome, la population pouvant être réduite
+        # par la suppression des doublons
+        nb_selected = max((int)(len(population)/100 * self.selection_rate), 1)
+
+        if self.selection_method == "tournament":
+            return self.tournament_selection(population, nb_selected)
+
+        return heapq.nsmallest(nb_selected, population, key=lambda chromosome: chromosome.cost)
+
+    def remove_duplicates(self, population):
+        """Suppression des chromosomes dont le chemin est déjà dans la population, à une
+        rotation ou un sens de parcours près. En fin de recherche, cela évite que les places
+        de la selection soient toutes prises par des clones du meilleur chromosome."""
+        seen = set()
+        unique = []
+
+        for chromosome in population:
+            key = canonical_key(chromosome.genes)
+            if key not in seen:
+                seen.add(key)
+                unique.append(chromosome)
+
+        return unique
+
+    def tournament_selection(self, population, nb_selected):
+        """Selection par tournoi, sans aucun tri : chaque place est gagnée par le meilleur
+        de TOURNAMENTSIZE chromosomes tirés au hasard. Le meilleur chromosome de la
+        population est toujours gardé, en tête, pour ne jamais perdre la meilleure solution."""
+        best = min(population, key=lambda chromosome: chromosome.cost)
+        selected = [best]
+        choice = self.random.choice
+
+        for _ in range(nb_selected - 1):
+            winner = choice(population)
+            for _ in range(TOURNAMENTSIZE - 1):
+                challenger = choice(population)
+                if challenger.cost < winner.cost:
+                    winner = challenger
+            selected.append(winner)
+
+        return selected
+
+    def improve(self, population, deadline):
+        """ Mode mémétique : les LOCALSEARCHELITES chromosomes en tête de la population
+        (les meilleurs avec la selection élitiste) qui ne sont pas encore des optimums
+        locaux sont remplacés par leur version améliorée. Le meilleur est ensuite
+        replacé en tête si nécessaire.
+        """
+        improved = False
+
+        for index in range(min(LOCALSEARCHELITES, len(population))):
+            if not population[index].local_optimum:
+                population[index] = self.optimize(population[index], deadline)
+                improved = True
+
+        if improved:
+            best_index = min(range(len(population)), key=lambda index: population[index].cost)
+            population[0], population[best_index] = population[best_index], population[0]
+
+        return population
+
+    def neighbour_lists(self):
+        """Listes des NEIGHBOURSNUMBER plus proches voisins de chaque ville,
+        calculées une seule fois par instance. Avec la matrice et NumPy, ils sont sélectionnés
+        ligne par ligne par argpartition. Sinon, ils sont cherchés via un index spatial en
+        grille plutôt qu'en parcourant toutes les villes, sauf si les villes n'ont pas de
+        coordonnées (instance TSPLIB EXPLICIT, toutes les villes à l'origine) : on parcourt
+        alors les lignes de la matrice."""
+        if self.neighbours is None and self.numpy_matrix() is not None:
+            numpy = load_numpy()
+            n = self.nb_cities
+            k = min(NEIGHBOURSNUMBER, n - 1)
+            matrix = self.numpy_matrix()
+            # Les k + 1 plus proches de chaque ligne (dont la ville elle-même), triés
+            nearest = numpy.argpartition(matrix, k, axis=1)[:, :k + 1]
+            rows = numpy.arange(n)[:, None]
+            nearest = nearest[rows, numpy.argsort(matrix[rows, nearest], axis=1, kind='stable')].tolist()
+            self.neighbours = [[other for other in row if other != city][:k] for city, row in enumerate(nearest)]
+
+        if self.neighbours is None:
+            n = self.nb_cities
+            k = min(NEIGHBOURSNUMBER, n - 1)
+            positions = [tuple(city.pos) for city in self.cities]
+
+            if len(set(positions)) > 1:
+                grid = GridIndex(positions)
+                self.neighbours = [grid.k_nearest(x, y, k, city) for city, (x, y) in enumerate(positions)]
+                return self.neighbours
+
+            matrix = self.distances
+            self.neighbours = []
+            for city in range(n):
+                row = matrix[city * n:(city + 1) * n]
+                nearest = heapq.nsmallest(k + 1, range(n), key=row.__getitem__)
+                self.neighbours.append([other for other in nearest if other != city][:k])
+
+        return self.neighbours
+
+    def optimize(self, chromosome, deadline):
+        """ Recherche locale 2-opt et Or-opt restreinte aux listes de plus proches voisins,
+        avec des bits "don't look" : seules les villes dont une arête vient de changer
+        sont réexaminées (file active). La recherche s'arrête sur un optimum local ou
+        lorsque perf_counter() dépasse deadline. Retourne un nouveau Chromosome.
+
+        2-opt : pour une ville a et un voisin proche c, les arêtes (a, succ a) et
+        (c, succ c) sont remplacées par (a, c) et (succ a, succ c), en inversant la
+        portion entre les deux (et de même avec les prédécesseurs).
+        Or-opt : une portion de 1 à OROPTLENGTH villes commençant en a est déplacée
+        à côté d'un voisin proche c, dans un sens ou dans l'autre.
+        """
+        n = self.nb_cities
+        if n < 8:
+            chromosome.local_optimum = True
+            return chromosome
+
+        matrix = self.distances
+        neighbours = self.neighbour_lists()
+        tour = chromosome.genes.tolist()
+        pos = [0] * n
+        for index, city in enumerate(tour):
+            pos[city] = index
+        cost = chromosome.cost
+
+        # File des villes à examiner : une ville absente de la file a son bit "don't look"
+        active = deque(tour)
+        queued = bytearray(b'\x01') * n
+
+        def activate(*cities_to_activate):
+            for city in cities_to_activate:
+                if not queued[city]:
+                    queued[city] = 1
+                    active.append(city)
+
+        def reverse(start, end):
+            # Inversion de la portion cyclique [start, end]. Si elle couvre plus de la
+            # moitié du chemin, on inverse le complément, ce qui donne le même cycle.
+            start, end = start % n, end % n
+            length = (end - start) % n + 1
+            if 2 * length > n:
+                start, end = (end + 1) % n, (start - 1) % n
+                length = n - length
+            for _ in range(length // 2):
+                city_start, city_end = tour[start], tour[end]
+                tour[start], tour[end] = city_end, city_start
+                pos[city_end], pos[city_start] = start, end
+                start = (start + 1) % n
+                end = (end - 1) % n
+
+        iterations = 0
+        local_optimum = True
+
+        while active:
+            iterations += 1
+            if iterations % 64 == 0 and perf_counter() > deadline:
+                local_optimum = False
+                break
+
+            a = active.popleft()
+            queued[a] = 0
+            row = a * n
+            i = pos[a]
+            succ_a = tour[(i + 1) % n]
+            pred_a = tour[i - 1]
+            d_succ = matrix[row + succ_a]
+            d_pred = matrix[row + pred_a]
+            improved = False
+
+            # 2-opt
+            for c in neighbours[a]:
+                d_ac = matrix[row + c]
+                if d_ac >= d_succ and d_ac >= d_pred:
+                    break
+                j = pos[c]
+
+                if d_ac < d_succ:
+                    succ_c = tour[(j + 1) % n]
+                    if c != succ_a and succ_c != a:
+                        delta = d_ac + matrix[succ_a * n + succ_c] - d_succ - matrix[c * n + succ_c]
+                        if delta < -EPSILON:
+                            reverse(i + 1, j)
+                            cost += delta
+                            activate(a, succ_a, c, succ_c)
+                            improved = True
+                            break
+
+                if d_ac < d_pred:
+                    pred_c = tour[j - 1]
+                    if c != pred_a and pred_c != a:
+                        delta = d_ac + matrix[pred_a * n + pred_c] - d_pred - matrix[c * n + pred_c]
+                        if delta < -EPSILON:
+                            reverse(i, j - 1)
+                            cost += delta
+                            activate(a, pred_a, c, pred_c)
+                            improved = True
+                            break
+
+            if improved:
+                continue
+
+            # Or-opt : déplacement de la portion [a, ..., last]
+            for length in range(1, OROPTLENGTH + 1):
+                last = tour[(i + length - 1) % n]
+                before = pred_a
+                after = tour[(i + length) % n]
+                segment = set(tour[(i + t) % n] for t in range(length))
+                if before in segment or after in segment:
+                    break
+                removal_gain = matrix[before * n + a] + matrix[last * n + after] - matrix[before * n + after]
+
+                for c in neighbours[a]:
+                    d_ac = matrix[row + c]
+                    if d_ac >= removal_gain:
+                        break
+                    if c in segment:
+                        continue
+                    j = pos[c]
+
+                    # Insertion entre c et son successeur : c, a, ..., last, succ c
+                    succ_c = tour[(j + 1) % n]
+                    if succ_c not in segment and c != before:
+                        delta = d_ac + matrix[last * n + succ_c] - matrix[c * n + succ_c] - removal_gain
+                        if delta < -EPSILON:
+                            moved, reversed_segment, anchor, other = segment, False, c, succ_c
+                            improved = True
+                            break
+
+                    # Insertion entre le prédécesseur de c et c : pred c, last, ..., a, c
+                    pred_c = tour[j - 1]
+                    if pred_c not in segment and c != after:
+                        delta = d_ac + matrix[pred_c * n + last] - matrix[pred_c * n + c] - removal_gain
+                        if delta < -EPSILON:
+                            moved, reversed_segment, anchor, other = segment, True, c, pred_c
+                            improved = True
+                            break
+
+                if improved:
+                    ordered = [tour[(i + t) % n] for t in range(length)]
+                    rest = [city for city in tour if city not in moved]
+                    index = rest.index(anchor)
+                    if reversed_segment:
+                        ordered.reverse()
+                        rest[index:index] = ordered
+                    else:
+                        rest[index + 1:index + 1] = ordered
+                    tour[:] = rest
+                    for index, city in enumerate(tour):
+                        pos[city] = index
+                    cost += delta
+                    activate(a, last, before, after, anchor, other)
+                    break
+
+        optimized = Chromosome(array(self.genes_typecode, tour), cost)
+        optimized.local_optimum = local_optimum
+        return optimized
+
+    # Croisements du portefeuille, par nom
+    CROSSOVERS = ("ox", "ox_random", "erx", "pmx")
+
+    def cross(self, operator, chromosome_x, chromosome_y):
+        """Croisement de deux chromosomes par le croisement operator du portefeuille"""
+        nb_genes = self.nb_cities
+        if operator == "ox":
+            return ox_cross(chromosome_x, chromosome_y, int(nb_genes / 2 - nb_genes / 4), int(nb_genes / 2 + nb_genes / 4))
+        if operator == "ox_random":
+            return ox_cross(chromosome_x, chromosome_y, *random_window(self.random, nb_genes))
+        if operator == "pmx":
+            return pmx_cross(chromosome_x, chromosome_y, *random_window(self.random, nb_genes))
+        return erx_cross(chromosome_x, chromosome_y, self.random)
+
+    def crossing(self, population, size):
+        """ Le croisement s'effectue via la méthode de croisement en deux points (ox).
+        Les deux chromosomes qui sont utilisés pour le croisement sont choisi aléatoirement.
+        La portion qui est réarrangée pour être réorganisée est toujours de la taille de la moitié
+        des gênes qui composent un chemin. On pourrait imaginer faire varier la longueur à chaque
+        croisement, mais il faut vérifier que ca apporte vraiment quelque chose.
+
+        Avec crossover = "portfolio", chaque enfant est créé par l'un des croisements de
+        CROSSOVERS (ox sur la moitié centrale, ox et pmx sur une fenêtre au hasard,
+        recombinaison d'arêtes), choisi selon le rendement récent de chacun (voir
+        OperatorPortfolio).
+        """
+        if self.portfolio is not None:
+            return self.portfolio_crossing(population, size)
+
+        start_ox_index = int(len(population[0].genes) / 2 - len(population[0].genes) / 4)
+        end_ox_index = int(len(population[0].genes) / 2 + len(population[0].genes) / 4)
+
+        nb_to_create = size - len(population)
+        offspring = []
+
+        for chromosome_index in range(0, nb_to_create):
+            chromosome_x = self.random.choice(population)
+            chromosome_y = self.random.choice(population)
+
+            offspring.append(ox_cross(chromosome_x, chromosome_y, start_ox_index, end_ox_index))
+
+        # Les enfants sont évalués ensemble, en un seul lot, puis ajoutés à la population
+        costs = self.evaluate_batch(offspring)
+        population.extend(Chromosome(genes, cost) for genes, cost in zip(offspring, costs))
+
+        return population
+
+    def portfolio_crossing(self, population, size):
+        """ Croisement par le portefeuille : les enfants sont répartis entre les croisements
+        selon leur rendement, puis le gain de chaque enfant et le temps passé à le créer et
+        à l'évaluer sont crédités à son croisement. Le gain est l'avance de l'enfant sur le
+        moins bon des chromosomes sélectionnés : un enfant qui n'aurait pas survécu à la
+        selection n'a rien apporté.
+        """
+        portfolio = self.portfolio
+        nb_to_create = size - len(population)
+        operators = portfolio.choose(self.random, nb_to_create)
+        threshold = max(chromosome.cost for chromosome in population)
+        offspring = []
+        durations = []
+
+        for operator in operators:
+            chromosome_x = self.random.choice(population)
+            chromosome_y = self.random.choice(population)
+            start = perf_counter()
+            offspring.append(self.cross(self.CROSSOVERS[operator], chromosome_x, chromosome_y))
+            durations.append(perf_counter() - start)
+
+        # Les enfants sont évalués ensemble, en un seul lot, puis ajoutés à la population ;
+        # le temps d'évaluation est réparti également entre eux
+        start = perf_counter()
+        costs = self.evaluate_batch(offspring)
+        evaluation_time = (perf_counter() - start) / max(len(offspring), 1)
+
+        for operator, cost, duration in zip(operators, costs, durations):
+            portfolio.record(operator, max(threshold - cost, 0), duration + evaluation_time)
+        portfolio.update()
+
+        population.extend(Chromosome(genes, cost) for genes, cost in zip(offspring, costs))
+        return population
+
+    def mutate(self, population, mutation_rate):
+        """ Mutation appliquée sur la population. Les échantillons qui subissent une mutation
+            Sont choisis totalement au hasard. On fait muter un certain taux de la population.
+            Très important, les mutations crées de nouveaux échantillons pour la population,
+            on ne perd pas les chromosomes de base.
+            Les mutants ne passent pas par evaluate_batch : leur coût est obtenu en O(1)
+            depuis celui du parent (voir mutate_chromosome), ce qui reste moins cher
+            qu'une évaluation complète, même vectorisée.
+        """
+        for _ in range(0, int(len(population) / 100 * mutation_rate)):
+            chromosome = self.random.choice(population)
+            population.append(self.mutate_chromosome(chromosome))
+
+        return population
+
+    def mutate_chromosome(self, chromosome):
+        """Mutation du chromosome en selectionnant une partie des gênes au hasard
+        et en inversant cette portion. On l'effectue deux fois de suite, le faire
+        plus de fois ne semble pas améliorer drastiquement les résultats, et on
+        perd du temps.
+
+        Il a été implémenté un mélange entre swap au hasard de gênes et inversion
+        de l'ordre de séquences de gênes, mais le swap ne semble pas apporter
+        d'améliorations notable
+
+        Le problème étant symétrique, inverser la portion [start, end[ ne modifie
+        que deux arêtes : (avant, start) et (end - 1, end) sont remplacées par
+        (avant, end - 1) et (start, end). Le coût du nouveau chromosome est donc
+        obtenu en O(1) à partir de celui du parent, sans recalcul complet."""
+
+        # On évite de recopier uniquement la référence, la slice de l'array
+        # est une copie directe du buffer
+        new_genes_list = chromosome.genes[:]
+        nb_genes = len(new_genes_list)
+        matrix = self.distances
+        cost = chromosome.cost
+
+        # for _ in range(0,1):
+        #     index1 = random.randrange(0, len(self.genes))
+        #     index2 =  random.randrange(0, len(self.genes))
+        #     new_genes_list[index2], new_genes_list[index1] = new_genes_list[index1], new_genes_list[index2]
 
-        old_best_cost = best_cost
+        for _ in range(0,2):
+            start_index = self.random.randrange(0, nb_genes)
+            end_index = self.random.randrange(0, nb_genes)
 
-        if gui:
-            draw_best_path(population, window)
+            if end_index < start_index:
+                start_index, end_index = end_index, start_index
 
-        population = crossing(population, population_size)
-        population = mutate(population)
+            # Une portion de moins de deux gênes ne change pas le chemin
+            if end_index - start_index < 2:
+                continue
 
-        # Dès que les 3/4 du temps est passé, on tente d'augmenter le taux de mutation
-        # pour éviter de rester dans un minimum local
-        if time_left < maxtime/4 or stagnation > 2000 and not augmentation_up:
-            mutation_rate = second_mutation_rate
-            augmentation_up = True
+            # Mise à jour du coût via les deux arêtes modifiées. end_index est
+            # toujours inférieur au nombre de gênes, start_index - 1 vaut -1 au
+            # début du chemin, ce qui correspond bien à la dernière ville.
+            before = new_genes_list[start_index - 1] * nb_genes
+            first = new_genes_list[start_index]
+            last = new_genes_list[end_index - 1]
+            after = new_genes_list[end_index]
+            cost += (matrix[before + last] + matrix[first * nb_genes + after]
+                     - matrix[before + first] - matrix[last * nb_genes + after])
 
-        time2 = time()
-        elapsed_time = time2 - time1
-        elapsed_time = elapsed_time + elapsed_time * time_error_rate
-        time_left -= elapsed_time
+            part_to_reverse = new_genes_list[start_index:end_index]
+            part_to_reverse.reverse()
 
-    # Mise en forme du retour de la meilleure solution trouvée
-    population = sorted(population, key=lambda chromosome: chromosome.cost)
-    best_solution = population[0]
-    best_cost = best_solution.cost
-    best_path = [cities_list[city].name for city in best_solution.genes]
+            new_genes_list[start_index:end_index] = part_to_reverse
 
-    # Dessin du meilleur chemin si on est en mode graphique
-    if window != None:
-        draw_best_path(population, window)
-        text = font.render("Coût : " + str(population[0].cost), True, WHITE)
-        textRect = text.get_rect()
-        window.blit(text, textRect)
+        return Chromosome(new_genes_list, cost)
+
+    def evolve(self, maxtime = DEFAULTMAXTIME, window = None, gui = False, migration = None):
+        """ Boucle principale de l'algorithme génétique, sous forme de générateur.
+            Un Chromosome est produit à chaque fois qu'un meilleur chemin est trouvé ;
+            le dernier produit est la meilleure solution de la résolution. L'appelant
+            peut arrêter la recherche à tout moment en fermant le générateur.
+            Les paramètres sont ceux de solve().
+        """
+        # Taux de mutation courant, local à la résolution pour qu'une nouvelle
+        # résolution reparte du taux initial
+        mutation_rate = self.mutation_rate
+        # Détermine si on est dans le second seuil de mutation
+        augmentation_up = False
+
+        stagnation = 0
+        old_best_cost = 0
+        best_solution = None
+
+        # Estimation incrémentale de la diversité, utilisée par le mode adaptatif
+        # et par l'instrumentation
+        diversity = self.diversity = DiversityEstimator()
+        if self.crossover == "portfolio":
+            self.portfolio = OperatorPortfolio(self.CROSSOVERS)
+        convergence_stagnation = max(CONVERGENCESTAGNATION, CONVERGENCESTAGNATIONPERCITY * self.nb_cities)
+        converged = False
+
+        # Les mesures par phase ne sont faites que si quelqu'un les observe
+        instrumented = self.instrumented = bool(self.observers)
+        generation = 0
+
+        # Création de la population, ou reprise de celle d'une résolution précédente
+        resumed = self.load_checkpoint(self.resume) if self.resume else None
+        if resumed is None:
+            seeding_deadline = perf_counter() + SEEDINGTIMESHARE * (maxtime - (time() - self.starting_time))
+            population = self.populate(self.population_size, seeding_deadline)
+        else:
+            population, state = resumed
+            # La stagnation repart de zéro : reprendre, c'est demander à poursuivre la recherche
+            mutation_rate = state['mutation_rate']
+            augmentation_up = state['augmentation_up']
+            old_best_cost = state['old_best_cost']
+            generation = state['generation']
+            diversity.value = state['diversity']
+
+        # Échéance absolue, calculée depuis le lancement du programme
+        budget = TimeBudget(self.starting_time, maxtime)
+
+        # Paramètres adaptatifs enregistrés avec la population dans les points de reprise
+        def checkpoint_state():
+            return {'mutation_rate': mutation_rate, 'augmentation_up': augmentation_up,
+                    'old_best_cost': old_best_cost,
+                    'generation': generation, 'diversity': diversity.value}
+        next_checkpoint = perf_counter() + CHECKPOINTINTERVAL
+
+        # Boucle principale de l'algorithme génétique
+        while not budget.expired() and stagnation < MAXSAMESOLUTIONNUMBER and not converged \
+                and not (gui and window.closed):
+            if instrumented:
+                selection_start = perf_counter()
+            if self.deduplicate:
+                population = self.remove_duplicates(population)
+            population = self.selection(population)
+            if instrumented:
+                selection_time = perf_counter() - selection_start
+
+            # Mode mémétique : amélioration des meilleurs chromosomes par recherche locale,
+            # sans dépasser le temps restant
+            if self.local_search:
+                population = self.improve(population, budget.deadline)
+
+            # A ce moment, le meilleur chromosome est en tête car la selection vient de l'y placer
+            best_cost = population[0].cost
+
+            # Les coûts de chemins identiques (à une rotation près) ou évalués de manière
+            # incrémentale peuvent différer d'une erreur d'arrondi, qui n'est pas une amélioration
+            if abs(best_cost - old_best_cost) <= EPSILON * best_cost:
+                stagnation += 1
+            else:
+                stagnation = 0
+
+            old_best_cost = best_cost
+
+            if best_solution is None or best_cost < best_solution.cost:
+                best_solution = population[0]
+                # La fenêtre ne reçoit que les améliorations, qu'elle dessine à son rythme
+                if gui:
+                    window.publish(best_solution.genes, best_cost)
+                yield best_solution
+
+            if (self.adaptive or instrumented) and generation % DIVERSITYINTERVAL == 0 and len(population) > 1:
+                chromosome_x, chromosome_y = self.random.sample(population, 2)
+                diversity.update(chromosome_x.genes, chromosome_y.genes)
+
+            if self.adaptive:
+                # Mutations renforcées tant que la population est trop homogène
+                if augmentation_up or diversity.value < DIVERSITYLOW:
+                    mutation_rate = self.second_mutation_rate
+                else:
+                    mutation_rate = self.mutation_rate
+                converged = diversity.value < CONVERGENCEDIVERSITY and stagnation >= convergence_stagnation
+
+            if instrumented:
+                stats = GenerationStats(generation, time() - self.starting_time, population, diversity.value)
+                stats.selection_time = selection_time
+                self.evaluation_time = 0
+                crossing_start = perf_counter()
+
+            population = self.crossing(population, self.population_size)
+
+            if instrumented:
+                mutation_start = perf_counter()
+                stats.evaluation_time = self.evaluation_time
+                stats.crossing_time = mutation_start - crossing_start - self.evaluation_time
+
+            population = self.mutate(population, mutation_rate)
+
+            if instrumented:
+                stats.mutation_time = perf_counter() - mutation_start
+                self.notify(stats)
+            generation += 1
+
+            if migration is not None:
+                population = migration(population)
+
+            # Dès que les 3/4 du temps est passé, on tente d'augmenter le taux de mutation
+            # pour éviter de rester dans un minimum local
+            if budget.time_left < maxtime/4 or stagnation > 2000 and not augmentation_up:
+                mutation_rate = self.second_mutation_rate
+                augmentation_up = True
+
+            if self.checkpoint and perf_counter() >= next_checkpoint:
+                self.save_checkpoint(self.checkpoint, population, checkpoint_state())
+                next_checkpoint = perf_counter() + CHECKPOINTINTERVAL
+
+        if self.checkpoint:
+            self.save_checkpoint(self.checkpoint, population, checkpoint_state())
+
+        # Les derniers enfants et mutants n'ont pas encore été selectionnés
+        final_solution = min(population, key=lambda chromosome: chromosome.cost)
+        if best_solution is None or final_solution.cost < best_solution.cost:
+            yield final_solution
+
+    def fingerprint(self):
+        """Empreinte (CRC32) des positions des villes et des distances, pour vérifier qu'un
+        point de reprise correspond bien à l'instance. Les positions ne suffisent pas : les
+        villes d'une instance TSPLIB EXPLICIT sans coordonnées sont toutes à l'origine.
+        Pour des distances calculées à la demande, seule la fonction de distance compte.
+        L'empreinte est calculée une seule fois par Solver : elle parcourt toute la matrice."""
+        if self.instance_fingerprint is None:
+            positions = array('d', [coordinate for city in self.cities for coordinate in city.pos])
+            crc = zlib.crc32(positions.tobytes())
+            if isinstance(self.distances, LazyDistances):
+                crc = zlib.crc32(self.distances.metric.encode(), crc)
+            else:
+                crc = zlib.crc32(memoryview(self.distances).cast('B'), crc)
+            self.instance_fingerprint = crc
+        return self.instance_fingerprint
+
+    def save_checkpoint(self, file, population, state):
+        """Enregistrement de l'état de la résolution dans un fichier binaire compact :
+        l'en-tête (CHECKPOINTHEADER) avec les paramètres adaptatifs pris dans state, l'état
+        du générateur aléatoire, puis les gênes des chromosomes, bout à bout.
+        Le fichier est écrit à côté puis renommé (voir replaced_file), pour qu'un arrêt
+        brutal pendant l'écriture ne détruise pas le point de reprise précédent."""
+        random_version, random_state, gauss_next = self.random.getstate()
+        header = CHECKPOINTHEADER.pack(CHECKPOINTMAGIC, CHECKPOINTVERSION, self.genes_typecode.encode(),
+                                       state['augmentation_up'], self.nb_cities, self.fingerprint(),
+                                       len(population), state['generation'],
+                                       state['mutation_rate'], state['diversity'], state['old_best_cost'],
+                                       random_version, gauss_next is not None, gauss_next or 0.0)
+
+        with replaced_file(file) as fichier:
+            fichier.write(header)
+            array('I', random_state).tofile(fichier)
+            for chromosome in population:
+                chromosome.genes.tofile(fichier)
+
+    def load_checkpoint(self, file):
+        """Lecture d'un point de reprise écrit par save_checkpoint. Le générateur aléatoire
+        reprend son état, les coûts des chromosomes sont recalculés avec les distances de
+        l'instance, puis la population est ramenée à population_size (les meilleurs
+        chromosomes sont gardés, ou la population est complétée). Retourne le tuple
+        (population, état), ou None si le fichier n'existe pas."""
+        try:
+            with open(file, "rb") as fichier:
+                data = fichier.read()
+        except FileNotFoundError:
+            return None
+
+        (magic, version, typecode, augmentation_up, nb_cities, fingerprint, size, generation,
+         mutation_rate, diversity, old_best_cost, random_version, has_gauss, gauss_next) = CHECKPOINTHEADER.unpack_from(data)
+        if (magic, version) != (CHECKPOINTMAGIC, CHECKPOINTVERSION):
+            raise ValueError("%s n'est pas un point de reprise valide" % file)
+        if (nb_cities, fingerprint) != (self.nb_cities, self.fingerprint()):
+            raise ValueError("Le point de reprise %s correspond à une autre instance" % file)
+
+        offset = CHECKPOINTHEADER.size
+        random_state = array('I')
+        random_state.frombytes(data[offset:offset + 4 * 625])
+        offset += 4 * 625
+        self.random.setstate((random_version, tuple(random_state), gauss_next if has_gauss else None))
+
+        genes_size = array(typecode.decode()).itemsize * nb_cities
+        genes_lists = []
+        for _ in range(size):
+            genes = array(self.genes_typecode)
+            genes.frombytes(data[offset:offset + genes_size])
+            offset += genes_size
+            genes_lists.append(genes)
+        population = [Chromosome(genes, cost) for genes, cost in zip(genes_lists, self.evaluate_batch(genes_lists))]
+
+        # Démarrage à chaud avec une autre taille de population
+        if len(population) > self.population_size:
+            population = heapq.nsmallest(self.population_size, population, key=lambda chromosome: chromosome.cost)
+        elif len(population) < self.population_size:
+            population.extend(self.populate(self.population_size - len(population)))
+
+        state = {'augmentation_up': bool(augmentation_up), 'generation': generation,
+                 'mutation_rate': mutation_rate, 'diversity': diversity, 'old_best_cost': old_best_cost}
+        return population, state
+
+    def iterate(self, maxtime = DEFAULTMAXTIME):
+        """ Résolution progressive : générateur produisant un tuple (coût, chemin) à chaque
+            fois qu'un meilleur chemin est trouvé, jusqu'à l'expiration de maxtime.
+            Un appelant pressé peut utiliser le premier résultat suffisamment bon et
+            fermer le générateur (ou sortir de sa boucle) pour arrêter la recherche.
+        """
+        for best_solution in self.evolve(maxtime):
+            yield self.result(best_solution)
+
+    def result(self, chromosome):
+        """ Mise en forme d'une solution : coût et liste des noms des villes.
+            Les coûts des mutants étant mis à jour de manière incrémentale, on recalcule
+            le coût exact du chemin pour éviter toute dérive due aux arrondis
+        """
+        best_cost = exact_cost(self.cities, chromosome.genes.tolist(), self.tour_cost(chromosome.genes))
+        best_path = [self.cities[city].name for city in chromosome.genes]
+        return best_cost, best_path
+
+    def solve(self, maxtime = DEFAULTMAXTIME, window = None, gui = False, migration = None, verbose = True):
+        """ Résolution du problème du voyageur commercial.
+            Les paramètres sont facultatifs :
+            maxtime est le temps total de calcul désiré, en seconde, décompté depuis starting_time.
+            window est la fenêtre de DroxlerRoyGui, à laquelle sont publiés les meilleurs
+            chemins ; la recherche s'arrête si elle est fermée.
+            gui détermine si on désire le rendu graphique en temps réel
+            migration est une fonction appelée à chaque génération avec la population,
+            qui retourne la population éventuellement enrichie (utilisée par les îles).
+            verbose détermine si le meilleur coût est affiché à la fin
+        """
+        # On épuise le générateur, la dernière solution produite est la meilleure
+        for best_solution in self.evolve(maxtime, window, gui, migration):
+            pass
+
+        # Mise en forme du retour de la meilleure solution trouvée
+        best_cost, best_path = self.result(best_solution)
+
+        # Publication du meilleur chemin si on est en mode graphique
+        if window != None:
+            window.publish(best_solution.genes, best_cost)
+
+        if verbose:
+            print("Meilleur cout", best_cost )
+
+        return best_cost, best_path
+
+def solve(cities_list, window = None, maxtime = DEFAULTMAXTIME, gui = False, migration = None, verbose = True, **options):
+    """ Résolution du problème du voyageur commercial avec un Solver créé pour
+        l'occasion, dont le temps est décompté depuis maintenant. Voir Solver.solve.
+        Les options sont transmises au Solver.
+    """
+    return Solver(cities_list, **options).solve(maxtime, window, gui, migration, verbose)
+
+def island(cities_list, maxtime, starting_time, seed, inbox, outbox, results, options):
+    """ Processus d'une île du modèle en îles. Chaque île fait évoluer sa propre
+        population avec son propre Solver, et tous les MIGRATIONINTERVAL générations
+        envoie ses MIGRANTSNUMBER meilleurs chromosomes à l'île suivante (topologie
+        en anneau). Les chromosomes reçus sont ajoutés à la population, c'est la
+        prochaine selection qui décide de les garder ou non.
+        Le meilleur résultat de l'île est déposé dans la queue results.
+    """
+    # Les processus créés par fork héritent de l'état du générateur aléatoire,
+    # chaque île a donc son propre Solver avec sa propre graine
+    solver = Solver(cities_list, seed=seed, starting_time=starting_time, **options)
+    generation = 0
+
+    def migration(population):
+        nonlocal generation
+        generation += 1
+
+        if generation % MIGRATIONINTERVAL == 0:
+            # Après la mutation la population n'est plus triée, on prend les meilleurs
+            elites = heapq.nsmallest(MIGRANTSNUMBER, population, key=lambda chromosome: chromosome.cost)
+            try:
+                outbox.put_nowait([(chromosome.genes, chromosome.cost) for chromosome in elites])
+            except queue.Full:
+                # L'île voisine n'a pas encore consommé les migrants précédents
+                pass
+
+        try:
+            while True:
+                population.extend(Chromosome(genes, cost) for genes, cost in inbox.get_nowait())
+        except queue.Empty:
+            pass
+
+        return population
+
+    results.put(solver.solve(maxtime, migration=migration, verbose=False))
+
+def solve_islands(cities_list, maxtime = DEFAULTMAXTIME, islands = 0, starting_time = None, seed = None, **options):
+    """ Résolution en parallèle via un modèle en îles : islands populations
+        indépendantes évoluent chacune dans leur processus (une par coeur si
+        islands vaut 0), avec des migrations périodiques des meilleurs chromosomes.
+        Le meilleur résultat parmi toutes les îles est retourné, dans le même
+        temps maxtime (décompté depuis starting_time) que Solver.solve().
+        Les graines des îles sont tirées d'un générateur initialisé par seed.
+        Les options sont transmises au Solver de chaque île.
+    """
+    seeds = random.Random(seed)
+    if starting_time is None:
+        starting_time = time()
+    if islands <= 0:
+        islands = os.cpu_count() or 1
+
+    # Les îles s'arrêtent un peu avant le temps imparti pour laisser le temps
+    # au processus principal de récupérer leurs résultats
+    island_maxtime = maxtime - ISLANDTIMELIMIT
+
+    inboxes = [multiprocessing.Queue(maxsize=islands) for _ in range(islands)]
+    results = multiprocessing.Queue()
+    processes = []
+
+    for index in range(islands):
+        # Chaque île a ses propres points de reprise, suffixés par son numéro
+        island_options = dict(options)
+        for key in ('checkpoint', 'resume'):
+            if options.get(key):
+                island_options[key] = "%s.%d" % (options[key], index)
+        process = multiprocessing.Process(target=island,
+            args=(cities_list, island_maxtime, starting_time, seeds.random(),
+                  inboxes[index], inboxes[(index + 1) % islands], results, island_options))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+
+    solutions = []
+    for _ in range(islands):
+        timeout = max(maxtime - (time() - starting_time), 0) + ISLANDTIMELIMIT
+        try:
+            solutions.append(results.get(timeout=timeout))
+        except queue.Empty:
+            break
+
+    # Aucune île n'a fini à temps, par exemple si la population initiale d'une grande
+    # instance prend plus que maxtime : on attend la première île qui finit
+    while not solutions and any(process.is_alive() for process in processes):
+        try:
+            solutions.append(results.get(timeout=ISLANDTIMELIMIT))
+        except queue.Empty:
+            pass
+    if not solutions:
+        # Une île peut avoir déposé son résultat juste avant de se terminer
+        try:
+            solutions.append(results.get(timeout=ISLANDTIMELIMIT))
+        except queue.Empty:
+            pass
+
+    for process in processes:
+        process.join(ISLANDTIMELIMIT)
+        if process.is_alive():
+            process.terminate()
+
+    # Toutes les îles ont échoué : on résout dans ce processus
+    if not solutions:
+        solver = Solver(cities_list, seed=seeds.random(), starting_time=starting_time, **options)
+        solutions.append(solver.solve(maxtime, verbose=False))
+
+    best_cost, best_path = min(solutions, key=lambda solution: solution[0])
 
     print("Meilleur cout", best_cost )
 
     return best_cost, best_path
 
+def solve_job(job):
+    """ Résolution d'une tâche d'un lot, dans un processus de SolverPool. job est le
+        tuple (numéro, instance, maxtime, seed, options), où instance est un fichier
+        de villes ou une liste de positions (x, y). Le temps maxtime est décompté depuis
+        le début de la tâche, l'attente dans la file du pool n'est pas comptée.
+        Retourne le tuple (numéro, coût, chemin), ou (numéro, None, erreur) si la tâche
+        a échoué : une tâche invalide (fichier absent, ...) n'interrompt pas le lot.
+    """
+    number, instance, maxtime, seed, options = job
+    starting_time = time()
+
+    try:
+        if isinstance(instance, str):
+            cities_list, distances = load_instance(instance)
+        else:
+            # Les villes données par leurs positions sont nommées par leur indice
+            cities_list, distances = [City(pos, index) for index, pos in enumerate(instance)], None
+
+        solver = Solver(cities_list, seed=seed, starting_time=starting_time, distances=distances, **options)
+        return (number,) + solver.solve(maxtime, verbose=False)
+    except Exception as e:
+        return number, None, "%r" % e
+
+class SolverPool(object):
+    """ Pool de processus persistants pour résoudre de nombreuses petites instances.
+        Les processus sont créés une seule fois et restent prêts (module déjà importé)
+        d'un lot à l'autre ; chaque tâche est résolue par son propre Solver, sans état
+        partagé. À utiliser de préférence avec with, pour libérer les processus :
+
+            with SolverPool() as pool:
+                for number, cost, path in pool.solve([("data/pb010.txt", 1), (positions, 0.5)]):
+                    ...
+    """
+
+    __slots__ = ('pool', 'seeds', 'options')
+
+    def __init__(self, workers = 0, seed = None, **options):
+        """ workers est le nombre de processus (0 pour un par coeur), seed initialise le
+            générateur des graines des tâches, les options sont transmises aux Solver."""
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        self.pool = multiprocessing.Pool(workers)
+        self.seeds = random.Random(seed)
+        self.options = options
+
+    def solve(self, jobs, chunksize = 1):
+        """ Générateur résolvant un lot de tâches : jobs est un itérable de couples
+            (instance, maxtime), instance étant un fichier de villes (texte ou TSPLIB) ou
+            une liste de positions (x, y), et maxtime le temps imparti à cette tâche.
+            Les résultats (numéro de la tâche dans jobs, coût, chemin) sont produits dans
+            l'ordre où les tâches se terminent ; une tâche qui a échoué produit
+            (numéro, None, erreur), sans interrompre les autres. chunksize regroupe les tâches envoyées
+            ensemble à un processus, ce qui réduit les échanges pour les très petites tâches.
+        """
+        # Les graines sont tirées dans l'ordre des tâches, pas dans celui des résolutions
+        tasks = ((number, instance, maxtime, self.seeds.random(), self.options)
+                 for number, (instance, maxtime) in enumerate(jobs))
+        return self.pool.imap_unordered(solve_job, tasks, chunksize)
+
+    def close(self):
+        """Arrêt des processus, après la fin des tâches en cours"""
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.pool.terminate()
+
 ################################################################################
 #  Fin Algorithme génétique
 ################################################################################
 
-def ga_solve(file = None, gui=True, maxtime=DEFAULTMAXTIME):
-    """Point d'entrée pour l'utilisation de cet algorithme comme module"""
-    return parametre(file,gui,maxtime)
-
-def parametre(file = None, gui=True, maxtime=DEFAULTMAXTIME):
+def ga_solve(file = None, gui=True, maxtime=DEFAULTMAXTIME, islands=1, seed=None, log=None,
+             result_cache=None, refine=False, profile=None, **options):
+    """Point d'entrée pour l'utilisation de cet algorithme comme module.
+    islands permet de lancer plusieurs populations en parallèle (0 pour une par coeur),
+    il n'est utilisé que sans mode graphique. seed initialise le générateur aléatoire
+    pour obtenir des exécutions reproductibles (aux limites de temps près).
+    log est un fichier (.csv ou .jsonl) où enregistrer les statistiques de chaque
+    génération, uniquement sans mode graphique et sans îles.
+    result_cache est un répertoire où conserver la meilleure solution de chaque instance
+    (voir ResultCache), uniquement sans mode graphique : si les villes ont déjà été
+    résolues, la solution connue est retournée immédiatement, sauf si refine est vrai,
+    auquel cas elle sert de point de départ à une nouvelle recherche de maxtime secondes.
+    Les autres options sont transmises au Solver, par exemple local_search=True
+    pour le mode mémétique, ou checkpoint et resume pour enregistrer régulièrement
+    la population et reprendre une résolution interrompue :
+
+        ga_solve("grand.tsp", False, 3600, checkpoint="grand.ckpt", resume="grand.ckpt")
+
+    profile est un profil écrit par tuning.py : les paramètres mesurés pour la classe de
+    taille de l'instance remplacent les valeurs par défaut (voir load_profile).
+
+    Les fichiers .tsp sont lus au format TSPLIB (voir load_tsplib).
+    Chaque appel crée son propre Solver, aucun état n'est partagé entre deux appels."""
+    return parametre(file,gui,maxtime,islands,seed,log,result_cache,refine,profile,**options)
+
+def ga_iterate(file, maxtime=DEFAULTMAXTIME, seed=None, **options):
+    """Point d'entrée progressif, sans mode graphique : générateur produisant un tuple
+    (coût, chemin) à chaque amélioration de la meilleure solution. La recherche s'arrête
+    à l'expiration de maxtime, ou dès que l'appelant ferme le générateur, par exemple :
+
+        for cost, path in ga_iterate("data/pb100.txt", 20):
+            if cost < good_enough:
+                break
+    """
+    starting_time = time()
+    cities_list, distances = load_instance(file)
+    solver = Solver(cities_list, seed=seed, starting_time=starting_time, distances=distances, **options)
+    return solver.iterate(maxtime)
+
+def ga_solve_batch(jobs, workers=0, seed=None, chunksize=1, **options):
+    """Point d'entrée pour la résolution d'un lot d'instances, sans mode graphique :
+    générateur produisant un tuple (numéro, coût, chemin) par tâche, dans l'ordre où elles
+    se terminent, ou (numéro, None, erreur) pour une tâche qui a échoué. jobs est un itérable de couples (instance, maxtime), voir SolverPool.solve.
+    Les tâches sont réparties sur workers processus (0 pour un par coeur). Pour enchaîner
+    plusieurs lots sans recréer les processus, utiliser directement un SolverPool."""
+    with SolverPool(workers, seed, **options) as pool:
+        yield from pool.solve(jobs, chunksize)
+
+def load_cities(file):
+    """Lecture d'un fichier de villes, une ville par ligne au format : nom x y"""
+    return load_instance(file)[0]
+
+def load_instance(file, sidecar=True):
+    """Chargement d'un fichier de villes. Retourne le tuple (cities_list, distances), où
+    distances est la matrice des distances si elle est déjà connue, None sinon.
+    Les fichiers .tsp sont lus au format TSPLIB (voir load_tsplib), les autres au format
+    nom x y. Si sidecar est vrai, le fichier binaire associé est lu s'il est à jour, et
+    créé (ou remplacé) sinon ; un fichier binaire impossible à écrire est simplement ignoré."""
+    if file.endswith(TSPLIBEXTENSION):
+        return load_tsplib(file)
+
+    sidecar_file = file + SIDECAREXTENSION if sidecar else None
+    if sidecar_file:
+        instance = read_sidecar(file, sidecar_file)
+        if instance is not None:
+            return instance
+
+    names, coordinates = parse_cities(file)
+    cities_list = build_cities(names, coordinates)
+    distances = None
+
+    if sidecar_file:
+        if len(cities_list) <= FULLMATRIXLIMIT:
+            distances = build_distance_matrix(cities_list)
+        try:
+            write_sidecar(file, sidecar_file, names, coordinates, distances)
+        except OSError:
+            pass
+
+    return cities_list, distances
+
+def read_tsplib(file):
+    """Lecture d'un fichier TSPLIB : retourne le dictionnaire des entrées de l'en-tête
+    (clé : valeur) et celui des sections (nom : liste des valeurs lues après le nom)"""
+    header = {}
+    sections = {}
+    values = None
+
+    with open(file, "r") as fichier:
+        for line in fichier:
+            data = line.split()
+            if not data or data[0] == "EOF":
+                continue
+            if data[0].endswith("_SECTION"):
+                values = sections.setdefault(data[0], [])
+                values.extend(data[1:])
+            elif ":" in line and not data[0][0].isdigit() and not data[0][0] == "-":
+                key, value = line.split(":", 1)
+                header[key.strip().upper()] = value.strip()
+                values = None
+            elif values is not None:
+                values.extend(data)
+
+    return header, sections
+
+def load_tsplib(file):
+    """Chargement d'une instance symétrique au format TSPLIB. Les distances EUC_2D,
+    CEIL_2D et ATT sont calculées à partir des coordonnées (NODE_COORD_SECTION), les
+    distances EXPLICIT sont lues dans EDGE_WEIGHT_SECTION (matrice complète, triangle
+    supérieur ou inférieur, avec ou sans diagonale). Les villes sont nommées par leur
+    numéro. Retourne le tuple (cities_list, distances), comme load_instance."""
+    header, sections = read_tsplib(file)
+    if header.get("TYPE", "TSP").split()[0] != "TSP":
+        raise ValueError("Seules les instances TSP symétriques sont supportées : %s" % file)
+
+    nb_cities = int(header["DIMENSION"])
+    metric = header.get("EDGE_WEIGHT_TYPE", "EUC_2D")
+    if metric != "EXPLICIT" and metric not in METRICS:
+        raise ValueError("Type de distance non supporté : %s" % metric)
+
+    # Les instances EXPLICIT n'ont pas toujours de coordonnées, seulement parfois des
+    # coordonnées d'affichage ; sans elles, les villes sont toutes placées à l'origine
+    coordinates = sections.get("NODE_COORD_SECTION") or sections.get("DISPLAY_DATA_SECTION")
+    if coordinates:
+        names = coordinates[0::3][:nb_cities]
+        positions = [(float(x), float(y)) for x, y in zip(coordinates[1::3], coordinates[2::3])][:nb_cities]
+    else:
+        names = [str(index + 1) for index in range(nb_cities)]
+        positions = [(0, 0)] * nb_cities
+    cities_list = [City(pos, name) for pos, name in zip(positions, names)]
+
+    if metric != "EXPLICIT":
+        return cities_list, distance_table(cities_list, metric)
+
+    weights = [float(weight) for weight in sections["EDGE_WEIGHT_SECTION"]]
+    return cities_list, explicit_matrix(weights, nb_cities, header.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX"))
+
+def explicit_matrix(weights, nb_cities, weight_format):
+    """Matrice à plat des distances, à partir des poids d'EDGE_WEIGHT_SECTION dans le
+    format weight_format. Les formats par colonne sont les transposés des formats par
+    ligne, ce qui revient au même pour une matrice symétrique."""
+    weight_format = {"UPPER_COL": "LOWER_ROW", "LOWER_COL": "UPPER_ROW",
+                     "UPPER_DIAG_COL": "LOWER_DIAG_ROW", "LOWER_DIAG_COL": "UPPER_DIAG_ROW"}.get(weight_format, weight_format)
+    n = nb_cities
+
+    if weight_format == "FULL_MATRIX":
+        return array('d', weights[:n * n])
+
+    if weight_format == "UPPER_ROW":
+        cells = ((i, j) for i in range(n) for j in range(i + 1, n))
+    elif weight_format == "LOWER_ROW":
+        cells = ((i, j) for i in range(n) for j in range(i))
+    elif weight_format == "UPPER_DIAG_ROW":
+        cells = ((i, j) for i in range(n) for j in range(i, n))
+    elif weight_format == "LOWER_DIAG_ROW":
+        cells = ((i, j) for i in range(n) for j in range(i + 1))
+    else:
+        raise ValueError("Format de matrice non supporté : %s" % weight_format)
+
+    matrix = array('d', bytes(8 * n * n))
+    for (i, j), weight in zip(cells, weights):
+        matrix[i * n + j] = matrix[j * n + i] = weight
+    return matrix
+
+def load_tour(file):
+    """Lecture d'un chemin de référence au format TSPLIB (.opt.tour) : retourne la liste
+    des noms des villes (leurs numéros), dans l'ordre du chemin"""
+    header, sections = read_tsplib(file)
+    tour = []
+    for node in sections["TOUR_SECTION"]:
+        if node == "-1":
+            break
+        tour.append(node)
+    return tour
+
+def path_cost(cities_list, distances, path):
+    """Coût d'un chemin donné par les noms de ses villes, par exemple un chemin de
+    référence lu par load_tour, avec les distances retournées par load_instance"""
+    if distances is None:
+        distances = distance_table(cities_list)
+    n = len(cities_list)
+    index = {city.name: number for number, city in enumerate(cities_list)}
+    genes = [index[name] for name in path]
+    return sum(distances[a * n + b] for a, b in zip(genes, genes[1:] + genes[:1]))
+
+def parse_cities(file):
+    """Lecture en bloc d'un fichier de villes : le fichier est découpé en une seule fois,
+    puis les colonnes sont extraites par tranches. Retourne la liste des noms et un
+    array('i') des coordonnées (x0, y0, x1, y1, ...)."""
+    with open(file, "r") as fichier :
+        data = fichier.read().split()
+
+    if len(data) % 3:
+        raise ValueError("Fichier de villes mal formé : %s" % file)
+
+    names = data[0::3]
+    # Une fois les noms retirés, il ne reste que les coordonnées, déjà dans l'ordre
+    del data[0::3]
+    return names, array('i', map(int, data))
+
+def sidecar_padding(offset):
+    """Nombre d'octets à ajouter pour aligner offset sur 8 octets"""
+    return -offset % 8
+
+@contextmanager
+def replaced_file(file):
+    """Écriture d'un fichier binaire par remplacement : on écrit dans un fichier temporaire
+    unique du même répertoire, renommé en file à la fin du bloc with, pour qu'un lecteur
+    ne voie jamais un fichier incomplet. Le nom temporaire étant unique, plusieurs threads
+    ou processus peuvent écrire le même fichier en même temps ; le dernier renommage gagne.
+    En cas d'erreur, le fichier temporaire est supprimé et file reste inchangé."""
+    descriptor, temporary_file = tempfile.mkstemp(dir=os.path.dirname(file) or ".",
+                                                  prefix=os.path.basename(file) + ".")
+    try:
+        with os.fdopen(descriptor, "wb") as fichier:
+            yield fichier
+        os.replace(temporary_file, file)
+    except BaseException:
+        os.remove(temporary_file)
+        raise
+
+def write_sidecar(file, sidecar_file, names, coordinates, distances=None):
+    """Écriture du fichier binaire associé à file : en-tête, table des noms (séparés par
+    des retours à la ligne), coordonnées en int32 et éventuellement la matrice des
+    distances en double, chaque bloc étant aligné sur 8 octets. Le fichier est écrit
+    à côté puis renommé (voir replaced_file)."""
+    stat = os.stat(file)
+    names_table = "\n".join(names).encode("utf-8")
+    header = SIDECARHEADER.pack(SIDECARMAGIC, SIDECARVERSION, sys.byteorder == "big",
+                                distances is not None, len(names), len(names_table),
+                                stat.st_size, stat.st_mtime_ns)
+
+    with replaced_file(sidecar_file) as fichier:
+        fichier.write(header)
+        fichier.write(names_table)
+        fichier.write(bytes(sidecar_padding(len(header) + len(names_table))))
+        coordinates.tofile(fichier)
+        fichier.write(bytes(sidecar_padding(fichier.tell())))
+        if distances is not None:
+            distances.tofile(fichier)
+
+def read_sidecar(file, sidecar_file):
+    """Lecture du fichier binaire associé à file par projection en mémoire. La matrice des
+    distances n'est pas copiée : c'est une vue (memoryview) sur le fichier projeté.
+    Retourne (cities_list, distances), ou None si le fichier binaire n'existe pas ou ne
+    correspond pas au fichier de villes."""
+    try:
+        stat = os.stat(file)
+        with open(sidecar_file, "rb") as fichier:
+            mapping = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(mapping) < SIDECARHEADER.size:
+        return None
+    magic, version, big_endian, has_matrix, nb_cities, names_size, size, mtime = SIDECARHEADER.unpack_from(mapping)
+    if (magic, version, bool(big_endian)) != (SIDECARMAGIC, SIDECARVERSION, sys.byteorder == "big") \
+            or (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+        return None
+
+    offset = SIDECARHEADER.size
+    names = mapping[offset:offset + names_size].decode("utf-8").split("\n") if nb_cities else []
+    offset += names_size + sidecar_padding(offset + names_size)
+    coordinates = memoryview(mapping)[offset:offset + 8 * nb_cities]
+    offset += 8 * nb_cities
+    offset += sidecar_padding(offset)
+
+    distances = None
+    if has_matrix:
+        distances = memoryview(mapping)[offset:offset + 8 * nb_cities * nb_cities]
+        if len(distances) != 8 * nb_cities * nb_cities:
+            return None
+        distances = distances.cast('d')
+    if len(names) != nb_cities or len(coordinates) != 8 * nb_cities:
+        return None
+    coordinates = coordinates.cast('i')
+
+    return build_cities(names, coordinates), distances
+
+def build_cities(names, coordinates):
+    """Création des villes à partir de leurs noms et de leurs coordonnées (x0, y0, x1, y1, ...)"""
+    values = coordinates.tolist()
+    return list(map(City, zip(values[0::2], values[1::2]), names))
+
+def load_profile(file):
+    """Lecture d'un profil de paramètres écrit par tuning.py : un fichier JSON associant à
+    chaque classe de taille (nombre maximal de villes) les paramètres retenus, par exemple
+    {"20": {"population_size": 10, ...}, "100": {...}}. Retourne un dictionnaire indexé
+    par la taille maximale (entière) de chaque classe."""
+    with open(file, "r") as fichier:
+        profile = json.load(fichier)
+    return {int(bound): {key: value for key, value in parameters.items() if key in TUNABLEPARAMETERS}
+            for bound, parameters in profile.items()}
+
+def profile_parameters(profile, nb_cities):
+    """Paramètres d'un profil pour une instance de nb_cities villes : ceux de la plus petite
+    classe qui la contient, ou de la plus grande classe si l'instance les dépasse toutes"""
+    if not profile:
+        return {}
+    bounds = sorted(profile)
+    for bound in bounds:
+        if nb_cities <= bound:
+            return profile[bound]
+    return profile[bounds[-1]]
+
+def parametre(file = None, gui=True, maxtime=DEFAULTMAXTIME, islands=1, seed=None, log=None,
+              result_cache=None, refine=False, profile=None, **options):
     """
     Gestion des paramètres, suivant si le mode graphique est demandé, si on utilise
     l'algorithme en import et si on a défini un temps limite.
     """
-    window = None
     cities_list = None
-    global starting_time
+    distances = None
     starting_time = time()
 
     if(file):
-        cities_list = []
-        with open(file, "r") as fichier :
-            for line in fichier :
-                data = line.split()
-                cities_list.append(City((int(data[1]),int(data[2])), data[0]))
-    if(gui):
-        window = pygame.display.set_mode((500, 500))
-
+        cities_list, distances = load_instance(file)
+        # Les paramètres du profil pour cette taille d'instance, sauf ceux donnés explicitement
+        if profile:
+            options = dict(profile_parameters(load_profile(profile), len(cities_list)), **options)
     if (gui and not file):
         maxtime = DEFAULTMAXTIME
-        return display(cities_list, maxtime,gui,window)
-    elif(not gui and file):
-        return solve(cities_list, window, maxtime, gui)
+        return display(cities_list, maxtime, seed=seed, **options)
     elif(gui and file):
-        return display(cities_list,maxtime,gui,window)
+        return display(cities_list, maxtime, distances, seed=seed, **options)
+
+    # Sans mode graphique, la meilleure solution connue pour ces villes est retournée
+    # immédiatement, ou sert de point de départ si on demande de l'améliorer
+    cache = None
+    if result_cache:
+        cache = ResultCache(result_cache, cities_list, distances)
+        if cache.tour is not None:
+            if not refine:
+                print("Meilleur cout", cache.cost )
+                return cache.result()
+            options['initial_tours'] = [cache.tour]
+
+    if(islands != 1):
+        # Une vue sur un fichier projeté ne se transmet pas à un autre processus : les îles
+        # reçoivent une copie de la matrice, bien plus rapide à faire qu'à recalculer
+        if isinstance(distances, memoryview):
+            distances = array('d', distances.tobytes())
+        if distances is not None:
+            options['distances'] = distances
+        result = solve_islands(cities_list, maxtime, islands, starting_time, seed, **options)
+    elif(log):
+        solver = Solver(cities_list, seed=seed, starting_time=starting_time, distances=distances, **options)
+        with GenerationLogger(log) as logger:
+            solver.add_observer(logger)
+            result = solver.solve(maxtime)
+    else:
+        result = Solver(cities_list, seed=seed, starting_time=starting_time, distances=distances, **options).solve(maxtime)
 
+    if cache is not None:
+        cache.update(*result)
+    return result
 
 def main(argv):
     """
         NAME
             TSP : Solve the travelling salesman problem using genetic algorithm
         SYNOPSIS
-            python DroxlerRoy.py [--nogui] [--maxtime s] [filename]
+            python DroxlerRoy.py [--nogui] [--maxtime s] [--islands n] [--log file] [--localsearch]
+                                 [--checkpoint file] [--resume file] [--cache directory] [--refine]
+                                 [--profile file] [filename]
 
         PARAMETERS
             [--nogui] : disable the gui, default to true
             [--maxtime s] : diffine the maximum time of exectution in seconds , default at 1000 s
+            [--islands n] : number of populations evolved in parallel processes (island model),
+                            0 for one per core, default at 1. Only used with --nogui
+            [--log file] : write per generation statistics (convergence curve and time
+                           spent in each phase) to file, as CSV or as JSONL if the name
+                           ends with .jsonl. Only used with --nogui and a single island
+            [--localsearch] : memetic mode, improve the best chromosomes of each generation
+                              with 2-opt and Or-opt local search
+            [--checkpoint file] : save the population, random state and adaptive parameters
+                                  to file every few seconds and at the end of the run
+            [--resume file] : continue from the state saved in file, if it exists.
+                              Can be the same file as --checkpoint
+            [--cache directory] : keep the best tour of each instance in directory, and
+                                  return it immediately when the same cities are solved
+                                  again. Only used with --nogui
+            [--refine] : with --cache, start from the known tour and search for maxtime
+                         seconds, the cache is updated only if the new tour is better
+            [--profile file] : use the parameters measured by tuning.py for the size
+                               class of the instance
             [filename] : Format expected :
                                         City_Name X_Position Y_Position
                                         i.e :
                                         v0 54 391
                                         v1 77 315
                                         It uses the /data/pb010.txt path
+                         Files ending with .tsp are read as TSPLIB instances
+                         (EUC_2D, CEIL_2D, ATT or EXPLICIT)
 
     """
-    optlist, args = getopt.getopt(argv, '' ,['nogui', 'maxtime=','help'])
+    optlist, args = getopt.getopt(argv, '' ,['nogui', 'maxtime=', 'islands=', 'log=', 'localsearch', 'checkpoint=', 'resume=', 'cache=', 'refine', 'profile=', 'help'])
 
     file = None
     gui = True
     maxtime = DEFAULTMAXTIME
+    islands = 1
+    log = None
+    result_cache = None
+    refine = False
+    profile = None
+    options = {}
 
     if len(args) == 1:
         file = args[0]
@@ -491,83 +2235,48 @@ def main(argv):
             maxtime = int(a)
         if o == "--nogui":
             gui = False
+        if o == "--islands":
+            islands = int(a)
+        if o == "--log":
+            log = a
+        if o == "--localsearch":
+            options['local_search'] = True
+        if o == "--checkpoint":
+            options['checkpoint'] = a
+        if o == "--resume":
+            options['resume'] = a
+        if o == "--cache":
+            result_cache = a
+        if o == "--refine":
+            refine = True
+        if o == "--profile":
+            profile = a
         if o == "--help":
              print(main.__doc__)
              sys.exit()
 
-    parametre(file,gui,maxtime)
+    parametre(file,gui,maxtime,islands,None,log,result_cache,refine,profile,**options)
 
 ################################################################################
 #  Affichage
 ################################################################################
 
-def clear_window(window):
-    """ Dessin de la fenêtre avec les villes """
-    window.fill(BLACK)
-
-    for point in cities:
-        pygame.draw.rect(window, RED, [point.pos.x, point.pos.y, POINTSIZE, POINTSIZE])
-
-def draw_best_path(population, window):
-    """Dessin du meilleur chemin trouvé. Attention, la population doit être triée!
-    On pourrait la modifier pour ne passer que le meilleur chromosome"""
-    clear_window(window)
-
-    list_points = []
-    best_genes_list = population[0].genes
-    for gene in best_genes_list:
-        list_points.append(cities[gene].pos)
-
-    list_points.append(cities[best_genes_list[0]].pos)
-    pygame.draw.lines(window, WHITE, False, list_points, 1)
-    pygame.display.update()
-
-
-def display(cities_list = None, maxtime = DEFAULTMAXTIME, gui = True, window = None):
-    """Gestion de l'affichage via PyGame"""
-    LEFTCLICK = 1                     # Défini ainsi dans pygame
-    global starting_time
-
-    pygame.init()
-    pygame.display.set_caption('Problème du voyageur commercial')
-    font = pygame.font.Font(None, 30)
-    text = font.render("Temps : " + str(maxtime) +  "secondes. Pressez enter pour lancer", True, WHITE)
-    textRect = text.get_rect()
-    window.blit(text, textRect)
-    cost = -1
-    best_path = []
-    max_time_relauch = maxtime
-
-    if cities_list == None:
-        cities_list = []
-    else:
-        for point in cities_list:
-            pygame.draw.rect(window, RED, [point.pos.x, point.pos.y, POINTSIZE, POINTSIZE])
-
-    continued = True
-
-    while continued:
-        mouse_xy = pygame.mouse.get_pos()
-
-        for event in pygame.event.get():
-            # On est obligé de faire en deux lignes car les événements parcourus peuvent retourner false.
-            # On gère la fermeture via ESCAPE ou via la croix de la fenêtre
-            if (event.type == KEYDOWN and event.key == K_ESCAPE) or (event.type == QUIT):
-                continued = False
-                return cost, best_path
-
-            if (event.type == KEYDOWN and event.key == K_RETURN):
-                starting_time = time()
-                cost, best_path = solve(cities_list, window, max_time_relauch, gui)
+def display(cities_list = None, maxtime = DEFAULTMAXTIME, distances = None, **options):
+    """Lancement de l'interface graphique. Le module DroxlerRoyGui, et donc PyGame, n'est
+    importé qu'ici : la résolution sans mode graphique ne dépend pas de PyGame.
+    distances est la matrice des distances des villes chargées (par exemple celle d'une
+    instance TSPLIB), utilisée tant qu'aucune ville n'est ajoutée à la souris.
+    Les options sont transmises au Solver."""
+    import DroxlerRoyGui
+    # La fenêtre ajoute les villes cliquées à la fin de cities_list
+    nb_loaded = len(cities_list) if cities_list else 0
 
-            # Gestion des événements souris
-            if event.type == MOUSEBUTTONDOWN and event.button == LEFTCLICK:
-                x_mouse, y_mouse = event.pos[0], event.pos[1]
-                # Attention : envoie une liste de tuples! La synthaxe est fine.
-                cities_list.append(City(pos=(x_mouse, y_mouse)))
-                pygame.draw.rect(window, RED, (x_mouse, y_mouse, POINTSIZE, POINTSIZE))
+    def solve_cities(cities, window):
+        # Le temps est décompté depuis la création du Solver
+        known = distances if len(cities) == nb_loaded else None
+        return Solver(cities, distances=known, **options).solve(maxtime, window, True)
 
-        pygame.display.update()
+    return DroxlerRoyGui.display(cities_list, maxtime, solve_cities, City)
 
 
 ################################################################################
@@ -575,98 +2284,444 @@ def display(cities_list = None, maxtime = DEFAULTMAXTIME, gui = True, window = N
 ################################################################################
 
 class City(object):
-    """Représente une ville possible, avec un identifiant (à voir si il reste),
-       un nom inutile, et une position. Les infos inutiles pourraient devenir
-       utiles à l'avenir.
+    """Représente une ville possible, avec un nom et une position.
+       L'identifiant d'une ville est simplement son index dans le tableau
+       de villes, c'est lui qui est utilisé dans les gênes.
     """
-    # On ne garde qu'une liste d'indexes pour les gênes afin de ne pas dupliquer l'information
-    last_id = 0
+    # Pas de __dict__ par instance, la ville ne contient que son nom et sa position
+    __slots__ = ('name', 'pos')
 
     #Pour pos, passer un tuple (x,y)
     def __init__(self, pos, name = None):
-        self.id = City.last_id
         self.name = name
-        self.pos = Vector2(pos)
-        City.last_id = City.last_id + 1
+        self.pos = tuple(pos)
 
     def __repr__(self):
-        # return "[id:" + str(self.id) + " name : "+ self.name + " X:" + str(self.pos[0]) + " Y:" + str(self.pos[1]) + "]"
-        return "[id:{0.id} name:{0.name} X:{0.pos.x} Y:{0.pos.y}]".format(self)
+        return "[name:{0.name} X:{0.pos[0]} Y:{0.pos[1]}]".format(self)
+
+class ResultCache(object):
+    """Meilleures solutions connues, conservées sur disque d'une exécution à l'autre.
+    Une instance est identifiée par l'empreinte (SHA-1) de ses positions normalisées :
+    translatées pour que la plus petite abscisse et la plus petite ordonnée soient nulles,
+    puis triées, et de sa matrice des distances, dans le même ordre, si elle ne se déduit
+    pas des positions. L'empreinte ne dépend donc ni de l'ordre ni du nom des villes. Le chemin
+    est enregistré dans un fichier du répertoire (array('I') des rangs des villes dans
+    l'ordre trié), et son coût est recalculé avec les distances de l'instance courante."""
+
+    __slots__ = ('file', 'cities', 'distances', 'ranks', 'tour', 'cost')
+
+    def __init__(self, directory, cities_list, distances=None):
+        """ directory est le répertoire des solutions, distances la matrice des distances
+            des villes cities_list si elle est connue (sinon les distances sont euclidiennes)"""
+        self.cities = cities_list
+        self.distances = distances
+
+        min_x = min(city.pos[0] for city in cities_list)
+        min_y = min(city.pos[1] for city in cities_list)
+        positions = [(city.pos[0] - min_x, city.pos[1] - min_y) for city in cities_list]
+        # Ordre canonique des villes : ranks[rang] est l'indice de la ville de ce rang
+        self.ranks = sorted(range(len(positions)), key=positions.__getitem__)
+        normalized = array('d', [coordinate for index in self.ranks for coordinate in positions[index]])
+        digest = hashlib.sha1(normalized.tobytes())
+        # Les positions ne suffisent pas pour une instance TSPLIB EXPLICIT, dont les villes
+        # sans coordonnées sont toutes à l'origine : sa matrice est ajoutée à l'empreinte.
+        # Les autres matrices se déduisent des positions et ne sont pas parcourues.
+        if distances is not None and not isinstance(distances, LazyDistances) \
+                and coordinate_metric(cities_list, distances) is None:
+            n = len(cities_list)
+            numpy = load_numpy()
+            if numpy is not None:
+                order = numpy.array(self.ranks)
+                matrix = numpy.frombuffer(distances, dtype=numpy.float64).reshape(n, n)
+                digest.update(matrix[numpy.ix_(order, order)].tobytes())
+            else:
+                for row in self.ranks:
+                    digest.update(array('d', [distances[row * n + column] for column in self.ranks]).tobytes())
+        self.file = os.path.join(directory, digest.hexdigest() + RESULTCACHEEXTENSION)
+
+        self.tour = None
+        self.cost = None
+        try:
+            stored = array('I')
+            with open(self.file, "rb") as fichier:
+                stored.frombytes(fichier.read())
+        except FileNotFoundError:
+            return
+        if sorted(stored) != list(range(len(cities_list))):
+            return
+        self.tour = [self.ranks[rank] for rank in stored]
+        self.cost = self.tour_cost(self.tour)
+
+    def tour_cost(self, tour):
+        """Coût d'un chemin donné par les indices des villes"""
+        following = tour[1:] + tour[:1]
+        if self.distances is None:
+            positions = [city.pos for city in self.cities]
+            return sum(hypot(positions[b][0] - positions[a][0], positions[b][1] - positions[a][1])
+                       for a, b in zip(tour, following))
+        n = len(self.cities)
+        return exact_cost(self.cities, tour, sum(self.distances[a * n + b] for a, b in zip(tour, following)))
+
+    def result(self):
+        """Solution connue, au format retourné par ga_solve : (coût, chemin)"""
+        return self.cost, [self.cities[index].name for index in self.tour]
+
+    def update(self, cost, path):
+        """Enregistrement de la solution (coût, chemin) si elle est meilleure que celle
+        déjà connue. Le fichier est écrit à côté puis renommé (voir replaced_file)."""
+        if self.cost is not None and cost >= self.cost:
+            return
+        numbers = {city.name: index for index, city in enumerate(self.cities)}
+        rank_of = {index: rank for rank, index in enumerate(self.ranks)}
+        self.tour = [numbers[name] for name in path]
+        self.cost = cost
+
+        os.makedirs(os.path.dirname(self.file) or ".", exist_ok=True)
+        with replaced_file(self.file) as fichier:
+            array('I', [rank_of[index] for index in self.tour]).tofile(fichier)
+
+class OperatorPortfolio(object):
+    """Crédit en ligne des opérateurs d'un portefeuille : pour chaque opérateur, on cumule
+    sur une génération le gain produit et le temps de calcul consommé, et son rendement
+    (gain par seconde) est lissé d'une génération à l'autre. Les enfants de la génération
+    suivante sont tirés proportionnellement aux rendements, chaque opérateur gardant une
+    part minimale PORTFOLIOMINSHARE pour que son rendement continue d'être mesuré."""
+
+    __slots__ = ('names', 'credits', 'gains', 'times')
+
+    def __init__(self, names):
+        self.names = names
+        # Sans mesure, tous les opérateurs ont le même crédit
+        self.credits = [1.0] * len(names)
+        self.gains = [0.0] * len(names)
+        self.times = [0.0] * len(names)
+
+    def weights(self):
+        """Parts des enfants attribuées à chaque opérateur"""
+        total = sum(self.credits)
+        if total <= 0:
+            return [1.0 / len(self.names)] * len(self.names)
+        shares = [credit / total for credit in self.credits]
+        return [PORTFOLIOMINSHARE + (1 - PORTFOLIOMINSHARE * len(shares)) * share for share in shares]
+
+    def choose(self, random, count):
+        """Indices des opérateurs des count enfants de la génération"""
+        return random.choices(range(len(self.names)), self.weights(), k=count)
+
+    def record(self, operator, gain, duration):
+        self.gains[operator] += gain
+        self.times[operator] += duration
+
+    def update(self):
+        """Fin de génération : mise à jour des rendements des opérateurs utilisés"""
+        for operator, duration in enumerate(self.times):
+            if duration > 0:
+                rate = self.gains[operator] / duration
+                self.credits[operator] += PORTFOLIOSMOOTHING * (rate - self.credits[operator])
+        self.gains = [0.0] * len(self.names)
+        self.times = [0.0] * len(self.names)
+
+class FitnessCache(object):
+    """Cache borné (LRU) des coûts des chemins, indexé par canonical_key. Lorsque le cache
+    est plein, l'entrée utilisée le moins récemment est supprimée. Les compteurs hits et
+    misses permettent de mesurer son efficacité."""
+
+    __slots__ = ('entries', 'size', 'hits', 'misses')
+
+    def __init__(self, size):
+        self.entries = OrderedDict()
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Coût associé à la clé, None s'il n'est pas dans le cache"""
+        cost = self.entries.get(key)
+        if cost is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return cost
+
+    def put(self, key, cost):
+        self.entries[key] = cost
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+class TimeBudget(object):
+    """Gestion du temps de la boucle principale, basée sur une échéance absolue mesurée
+    avec perf_counter. Plutôt que de lire l'horloge à chaque génération, on ne la lit que
+    toutes les k générations, k étant ajusté à la durée mesurée des générations pour
+    vérifier environ toutes les CHECKPERIOD secondes. À chaque vérification, on prédit si
+    les générations suivantes tiennent encore dans le temps restant."""
+
+    __slots__ = ('deadline', 'time_left', 'generation_time', 'countdown', 'generations', 'last_check')
+
+    def __init__(self, starting_time, maxtime):
+        """ starting_time est l'instant de départ (time()), maxtime le temps imparti.
+            On garde la réserve TIMELIMIT pour le retour du résultat."""
+        now = perf_counter()
+        self.deadline = now + maxtime - (time() - starting_time) - TIMELIMIT
+        self.time_left = self.deadline - now
+        self.generation_time = 0
+        self.countdown = 0
+        self.generations = 0
+        self.last_check = now
+
+    def expired(self):
+        """Vrai s'il ne faut pas lancer de nouvelle génération. Appelé une fois par génération."""
+        if self.countdown > 0:
+            self.countdown -= 1
+            self.generations += 1
+            return False
+
+        now = perf_counter()
+        if self.generations:
+            self.generation_time = (now - self.last_check) / self.generations
+        self.time_left = self.deadline - now
+
+        if self.time_left <= self.generation_time * GENERATIONSAFETY:
+            return True
+
+        # Prochaine vérification dans environ CHECKPERIOD secondes, sans jamais laisser
+        # passer plus de la moitié du temps restant
+        if self.generation_time > 0:
+            self.countdown = int(min(CHECKPERIOD, self.time_left / 2) / self.generation_time)
+        self.generations = 1
+        self.last_check = now
+        return False
+
+class DiversityEstimator(object):
+    """Estimation peu coûteuse de la diversité de la population : à chaque mise à jour,
+    on compte les arêtes communes à deux chromosomes tirés au hasard, et la proportion
+    d'arêtes différentes est lissée par une moyenne mobile exponentielle. La valeur
+    vaut 1 pour des chemins sans arête commune, et tend vers 0 quand la population
+    n'est plus formée que de clones."""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 1.0
+
+    def update(self, genes_x, genes_y):
+        # Les ensembles d'arêtes sont construits en C via zip ; une arête de y peut
+        # apparaître dans x dans un sens ou dans l'autre
+        edges_x = set(zip(genes_x, genes_x[1:] + genes_x[:1]))
+        following_y = genes_y[1:] + genes_y[:1]
+        shared = len(edges_x.intersection(zip(genes_y, following_y)))
+        shared += len(edges_x.intersection(zip(following_y, genes_y)))
+
+        distance = 1 - shared / len(genes_x)
+        self.value += DIVERSITYSMOOTHING * (distance - self.value)
+
+class GridIndex(object):
+    """Index spatial en grille pour la recherche du plus proche voisin. Les points sont
+    répartis dans des cases d'environ un point chacune ; la recherche parcourt des anneaux
+    de cases de plus en plus grands autour du point demandé et s'arrête dès qu'aucun
+    anneau plus lointain ne peut contenir un point plus proche. Les points trouvés
+    peuvent être retirés de l'index au fur et à mesure (chemin du plus proche voisin)."""
+
+    __slots__ = ('positions', 'min_x', 'min_y', 'cell_size', 'columns', 'rows', 'cells')
+
+    def __init__(self, positions, indexes=None):
+        """ positions est la liste des positions (x, y) des points, indexes les
+            indices des points à indexer (par défaut tous)"""
+        if indexes is None:
+            indexes = range(len(positions))
+        indexes = list(indexes)
+        self.positions = positions
+
+        xs = [positions[index][0] for index in indexes]
+        ys = [positions[index][1] for index in indexes]
+        self.min_x, self.min_y = min(xs), min(ys)
+        width, height = max(xs) - self.min_x, max(ys) - self.min_y
+        self.cell_size = max(sqrt(width * height / len(indexes)), (width + height) / len(indexes), 1)
+        self.columns = int(width / self.cell_size) + 1
+        self.rows = int(height / self.cell_size) + 1
+        self.cells = [[] for _ in range(self.columns * self.rows)]
+
+        for index in indexes:
+            self.cells[self.cell(*positions[index])].append(index)
+
+    def cell(self, x, y):
+        """Numéro de la case contenant le point (x, y), bornée aux limites de la grille"""
+        column = min(max(int((x - self.min_x) / self.cell_size), 0), self.columns - 1)
+        row = min(max(int((y - self.min_y) / self.cell_size), 0), self.rows - 1)
+        return row * self.columns + column
+
+    def remove(self, index):
+        self.cells[self.cell(*self.positions[index])].remove(index)
+
+    def ring(self, cell, radius):
+        """Numéros des cases de l'anneau de rayon radius (en cases) autour de la case cell,
+        limité à la grille. L'anneau de rayon 0 est la case elle-même."""
+        column, row = cell % self.columns, cell // self.columns
+
+        for ring_row in range(max(row - radius, 0), min(row + radius, self.rows - 1) + 1):
+            # Sur les lignes intérieures de l'anneau, seules les deux cases du bord
+            if ring_row in (row - radius, row + radius):
+                ring_columns = range(column - radius, column + radius + 1)
+            else:
+                ring_columns = (column - radius, column + radius)
+            for ring_column in ring_columns:
+                if 0 <= ring_column < self.columns:
+                    yield ring_row * self.columns + ring_column
+
+    def nearest(self, x, y):
+        """Point indexé le plus proche de (x, y), None si l'index est vide"""
+        cell = self.cell(x, y)
+        best, best_distance = None, float('inf')
+
+        for radius in range(max(self.columns, self.rows)):
+            for ring_cell in self.ring(cell, radius):
+                for index in self.cells[ring_cell]:
+                    px, py = self.positions[index]
+                    distance = hypot(px - x, py - y)
+                    if distance < best_distance:
+                        best, best_distance = index, distance
+
+            # Tout point hors des anneaux parcourus est au moins à radius cases
+            if best is not None and best_distance <= radius * self.cell_size:
+                break
+
+        return best
+
+    def k_nearest(self, x, y, k, excluded=None):
+        """Les k points indexés les plus proches de (x, y), du plus proche au plus lointain,
+        sans le point d'indice excluded. Même parcours en anneaux que nearest."""
+        cell = self.cell(x, y)
+        # Tas des k meilleurs candidats, en distances négatives pour avoir le plus lointain en tête
+        found = []
+
+        for radius in range(max(self.columns, self.rows)):
+            for ring_cell in self.ring(cell, radius):
+                for index in self.cells[ring_cell]:
+                    if index == excluded:
+                        continue
+                    px, py = self.positions[index]
+                    distance = hypot(px - x, py - y)
+                    if len(found) < k:
+                        heapq.heappush(found, (-distance, index))
+                    elif distance < -found[0][0]:
+                        heapq.heapreplace(found, (-distance, index))
+
+            if len(found) == k and -found[0][0] <= radius * self.cell_size:
+                break
+
+        return [index for distance, index in sorted(found, reverse=True)]
+
+class LazyDistances(object):
+    """Distances calculées à la demande à partir des coordonnées, pour les instances trop
+    grandes pour une matrice complète. S'indexe comme la matrice à plat : la distance
+    entre i et j est distances[i * n + j]. Avec NumPy, pairs calcule un lot de distances
+    en une seule opération."""
+
+    __slots__ = ('xs', 'ys', 'nb_cities', 'metric', 'distance', 'numpy_xs', 'numpy_ys')
+
+    def __init__(self, cities_list, metric="EUCLIDEAN"):
+        self.xs = [city.pos[0] for city in cities_list]
+        self.ys = [city.pos[1] for city in cities_list]
+        self.nb_cities = len(cities_list)
+        self.metric = metric
+        self.distance = METRICS[metric]
+        self.numpy_xs = self.numpy_ys = None
+        numpy = load_numpy()
+        if numpy is not None:
+            self.numpy_xs = numpy.array(self.xs, dtype=numpy.float64)
+            self.numpy_ys = numpy.array(self.ys, dtype=numpy.float64)
+
+    def __len__(self):
+        return self.nb_cities * self.nb_cities
+
+    def __getitem__(self, index):
+        first, second = divmod(index, self.nb_cities)
+        return self.distance(self.xs[second] - self.xs[first], self.ys[second] - self.ys[first])
+
+    def __getstate__(self):
+        return (self.xs, self.ys, self.metric)
+
+    def __setstate__(self, state):
+        xs, ys, metric = state
+        self.__init__([City(pos) for pos in zip(xs, ys)], metric)
+
+    def pairs(self, first, second):
+        """Distances entre les villes de deux tableaux NumPy d'indices de même forme,
+        arrondies comme le fait la fonction de distance"""
+        dx = self.numpy_xs[second] - self.numpy_xs[first]
+        dy = self.numpy_ys[second] - self.numpy_ys[first]
+        return numpy_distances(dx, dy, self.metric)
 
 class Chromosome(object):
     """ représentation d'un individu sous la forme d'un chemin (suite de villes)
-    et d'un coût"""
-
-    def __init__(self, genes=None):
-        self.genes = genes
-        self.cost = 0
-        if not self.genes == None:
-            self.cost = self.calculate_cost()
-
-    def mutate(self):
-        """Mutation du chromosome en selectionnant une partie des gênes au hasard
-        et en inversant cette portion. On l'effectue deux fois de suite, le faire
-        plus de fois ne semble pas améliorer drastiquement les résultats, et on
-        perd du temps.
-
-        Il a été implémenté un mélange entre swap au hasard de gênes et inversion
-        de l'ordre de séquences de gênes, mais le swap ne semble pas apporter
-        d'améliorations notable"""
-
-        # On évite de recopier uniquement la référence
-        new_genes_list = list(self.genes)
-
-        # for _ in range(0,1):
-        #     index1 = random.randrange(0, len(self.genes))
-        #     index2 =  random.randrange(0, len(self.genes))
-        #     new_genes_list[index2], new_genes_list[index1] = new_genes_list[index1], new_genes_list[index2]
-
-        for _ in range(0,2):
-            start_index = random.randrange(0, len(self.genes))
-            end_index = random.randrange(0, len(self.genes))
-
-            if end_index < start_index:
-                start_index, end_index = end_index, start_index
-
-            part_to_reverse = new_genes_list[start_index:end_index]
-            part_to_reverse.reverse()
-
-            new_genes_list[start_index:end_index] = part_to_reverse
-
-        return Chromosome(new_genes_list)
-
-
-    def calculate_cost(self):
-        """Calcul du cout du chromosome, ici la distance total vol d'oiseau
-        selon l'ordre des villes"""
-        nb_genes = len(self.genes)
-        distance = 0
+    et d'un coût. Les gênes sont stockés dans un array compact d'entiers non signés
+    (voir Solver.genes_typecode), et l'instance n'a pas de __dict__ grâce à __slots__,
+    ce qui permet de grandes populations sur de grandes instances.
+    Le coût est calculé par le Solver qui possède la matrice des distances."""
 
-        c = cycle(self.genes)
-        next(c)
+    __slots__ = ('genes', 'cost', 'local_optimum')
 
-        for index1, index2 in zip(self.genes, c):
-            villeA = cities[index1]
-            villeB = cities[index2]
+    def __init__(self, genes=None, cost=0):
+        self.genes = genes
+        self.cost = cost
+        # Vrai si la recherche locale du mode mémétique n'a plus rien à améliorer
+        self.local_optimum = False
 
-            # Ces quelques lignes sont un point critique des performance de l'algorithme
-            # Le changement de la méthode de calcul de la distance à vol d'oiseaux
-            # Représente des variations du temps importante.
+    def __repr__(self):
+        return '[%s]' % ', '.join(map(str, self.genes)) + "] : Cost : " + str(self.cost)
 
-            # Utiliser la classe vec2 de pygame améliore d'un quart le temps de calcul
-            # par rapport aux autres méthodes. Les autres méthodes sont laissées en
-            # commentaire à titre informatif
+class GenerationStats(object):
+    """ Statistiques d'une génération, transmises aux observateurs du Solver.
+    Les coûts sont ceux de la population après la selection, la diversité est celle
+    estimée par le DiversityEstimator du Solver. Les temps sont en secondes :
+    crossing_time n'inclut pas evaluation_time, le temps d'évaluation des enfants."""
+
+    __slots__ = ('generation', 'elapsed', 'best_cost', 'mean_cost', 'diversity',
+                 'selection_time', 'crossing_time', 'mutation_time', 'evaluation_time')
+
+    FIELDS = __slots__
+
+    def __init__(self, generation, elapsed, population, diversity):
+        costs = [chromosome.cost for chromosome in population]
+        self.generation = generation
+        self.elapsed = elapsed
+        self.best_cost = min(costs)
+        self.mean_cost = sum(costs) / len(costs)
+        self.diversity = diversity
+        self.selection_time = 0
+        self.crossing_time = 0
+        self.mutation_time = 0
+        self.evaluation_time = 0
+
+    def as_dict(self):
+        return dict((field, getattr(self, field)) for field in self.FIELDS)
+
+class GenerationLogger(object):
+    """ Observateur qui enregistre les statistiques de chaque génération dans un
+    fichier, au format CSV ou JSONL (une ligne JSON par génération) selon
+    l'extension du fichier. Utilisable comme gestionnaire de contexte."""
+
+    def __init__(self, filename):
+        self.file = open(filename, "w", newline="")
+        self.jsonl = filename.endswith(".jsonl")
+        if not self.jsonl:
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(GenerationStats.FIELDS)
+
+    def __call__(self, stats):
+        if self.jsonl:
+            self.file.write(json.dumps(stats.as_dict()) + "\n")
+        else:
+            self.writer.writerow([getattr(stats, field) for field in GenerationStats.FIELDS])
 
-            # dx = abs(villeA.pos.x - villeB.pos.x)
-            # dy = abs(villeA.pos.y - villeB.pos.y)
+    def close(self):
+        self.file.close()
 
-            # distance += hypot(dx,dy)
-            # distance += sqrt(dx**2 + dy**2)
-            distance += villeA.pos.distance_to(villeB.pos)
-        return distance
+    def __enter__(self):
+        return self
 
-    def __repr__(self):
-        return '[%s]' % ', '.join(map(str, self.genes)) + "] : Cost : " + str(self.cost)
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 ################################################################################
@@ -0,0 +1,153 @@
+"""
+    Auteurs                      : Arnaud Droxler & Axel Roy
+    But                          : Interface graphique (PyGame) du solveur DroxlerRoy
+
+    Ce module n'est importé par DroxlerRoy que lorsque le mode graphique est demandé,
+    la résolution sans mode graphique ne dépend donc ni de PyGame ni de SDL.
+    Il ne connaît pas l'algorithme : la résolution lui est passée sous forme de fonction.
+
+    La résolution tourne dans son propre thread et publie ses meilleurs chemins dans la
+    fenêtre (Window.publish) ; la boucle d'affichage, qui reste dans le thread principal
+    comme l'exige SDL, ne dessine que le dernier chemin publié, au plus FRAMERATE fois par
+    seconde et seulement s'il a changé. L'algorithme ne perd donc plus de temps à dessiner,
+    et la fenêtre répond à ESCAPE et à la croix pendant la résolution.
+"""
+
+import threading
+
+import pygame
+from pygame.locals import *
+
+# Constantes pour PyGame
+WHITE = (255,255,255)
+RED = (255,0,0)
+BLACK = (0,0,0)
+
+# Taille des points pour représenter les villes
+POINTSIZE = 5
+# Taille de la fenêtre, en pixels
+WINDOWSIZE = (500, 500)
+# Nombre maximal d'images par seconde
+FRAMERATE = 30
+
+class Window(object):
+    """Fenêtre PyGame dans laquelle sont dessinés les villes et les chemins.
+       C'est l'objet passé au Solver en tant que window : le Solver y publie ses
+       meilleurs chemins, et s'arrête dès que closed est vrai.
+    """
+    __slots__ = ('surface', 'font', 'snapshot', 'closed')
+
+    def __init__(self):
+        pygame.init()
+        pygame.display.set_caption('Problème du voyageur commercial')
+        self.surface = pygame.display.set_mode(WINDOWSIZE)
+        self.font = pygame.font.Font(None, 30)
+        # Dernier chemin publié (gênes, coût), None s'il a déjà été dessiné
+        self.snapshot = None
+        self.closed = False
+
+    def publish(self, genes, cost):
+        """Publication d'un meilleur chemin, appelée depuis le thread de la résolution.
+        Les gênes sont copiés ; un chemin pas encore dessiné est simplement remplacé."""
+        self.snapshot = (genes[:], cost)
+
+    def clear(self, cities):
+        """ Dessin de la fenêtre avec les villes """
+        self.surface.fill(BLACK)
+
+        for point in cities:
+            self.draw_city(point.pos)
+
+    def draw_city(self, pos):
+        """ Dessin d'une ville à la position pos """
+        pygame.draw.rect(self.surface, RED, [pos[0], pos[1], POINTSIZE, POINTSIZE])
+
+    def draw_path(self, genes, cities):
+        """Dessin d'un chemin, donné par les gênes d'un chromosome"""
+        self.clear(cities)
+
+        list_points = [cities[gene].pos for gene in genes]
+        list_points.append(cities[genes[0]].pos)
+        pygame.draw.lines(self.surface, WHITE, False, list_points, 1)
+
+    def draw_text(self, message):
+        """Affichage d'un message en haut à gauche de la fenêtre"""
+        text = self.font.render(message, True, WHITE)
+        textRect = text.get_rect()
+        self.surface.blit(text, textRect)
+
+def display(cities_list, maxtime, solve, city_type):
+    """Gestion de l'affichage via PyGame.
+       solve(cities_list, window) lance une résolution et retourne le tuple (coût, chemin),
+       city_type est la classe utilisée pour les villes ajoutées à la souris.
+    """
+    LEFTCLICK = 1                     # Défini ainsi dans pygame
+
+    window = Window()
+    window.draw_text("Temps : " + str(maxtime) +  "secondes. Pressez enter pour lancer")
+    clock = pygame.time.Clock()
+    cost = -1
+    best_path = []
+    # Thread de la résolution en cours, et villes qu'elle résout
+    solving = None
+    solved_cities = None
+    # Résultat (coût, chemin) déposé par le thread de la résolution
+    results = []
+
+    if cities_list == None:
+        cities_list = []
+    else:
+        for point in cities_list:
+            window.draw_city(point.pos)
+
+    continued = True
+
+    while continued:
+        for event in pygame.event.get():
+            # On est obligé de faire en deux lignes car les événements parcourus peuvent retourner false.
+            # On gère la fermeture via ESCAPE ou via la croix de la fenêtre
+            if (event.type == KEYDOWN and event.key == K_ESCAPE) or (event.type == QUIT):
+                continued = False
+                # La résolution en cours s'arrête à la génération suivante
+                window.closed = True
+                if solving is not None:
+                    solving.join()
+                    if results:
+                        cost, best_path = results.pop()
+                return cost, best_path
+
+            # Pendant une résolution, les villes ne peuvent pas être modifiées
+            if solving is not None:
+                continue
+
+            if (event.type == KEYDOWN and event.key == K_RETURN):
+                solved_cities = list(cities_list)
+                solving = threading.Thread(target=lambda: results.append(solve(solved_cities, window)))
+                solving.start()
+
+            # Gestion des événements souris
+            if event.type == MOUSEBUTTONDOWN and event.button == LEFTCLICK:
+                x_mouse, y_mouse = event.pos[0], event.pos[1]
+                # Attention : envoie une liste de tuples! La synthaxe est fine.
+                cities_list.append(city_type(pos=(x_mouse, y_mouse)))
+                window.draw_city((x_mouse, y_mouse))
+
+        # La fin de la résolution est constatée avant de lire le dernier chemin publié,
+        # pour que le chemin final soit dessiné avant le coût
+        finished = solving is not None and not solving.is_alive()
+
+        # Dessin du dernier chemin publié, s'il a changé depuis la dernière image
+        snapshot = window.snapshot
+        if snapshot is not None:
+            window.snapshot = None
+            window.draw_path(snapshot[0], solved_cities)
+
+        if finished:
+            solving = None
+            if results:
+                cost, best_path = results.pop()
+                window.draw_text("Coût : " + str(cost))
+
+        pygame.display.update()
+        # Limite le nombre d'images par seconde, en rendant la main à la résolution
+        clock.tick(FRAMERATE)
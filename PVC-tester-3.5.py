@@ -10,6 +10,11 @@ v0.2, Matthieu Amiguet, HE-Arc
 v0.3, hatem Ghorbel, HE-Arc
 
 Python 3.5 Ready, Romain Claret
+
+Chaque cas (solveur, probleme, temps) est repete plusieurs fois avec des graines
+controlees, et les executions sont reparties sur un pool de processus. Pour chaque
+cas on rapporte la moyenne, la mediane, le meilleur resultat et l'ecart-type de la
+longueur du chemin, ainsi que le depassement maximal du temps imparti.
 '''
 
 # PARAMETRES
@@ -42,10 +47,22 @@ tests = (
 tolerance = 0.05
 
 # Fichier dans lequel �crire les r�sultats
+# Il n'est ouvert que par le processus principal, pas par les processus du pool
 import sys
-# outfile = sys.stdout
+# outfilename = None      # (console)
 # ou :
-outfile = open('results.csv', 'w')
+outfilename = 'results.csv'
+
+# Nombre de repetitions de chaque cas, pour distinguer une regression du bruit
+repetitions = 5
+
+# Graine de base : la repetition i d'un cas utilise la graine seed + i
+# (None pour des graines non controlees)
+seed = 0
+
+# Nombre de processus du pool (None pour un par coeur). Chaque solveur etant
+# limite dans le temps, il vaut mieux ne pas depasser le nombre de coeurs.
+workers = None
 
 # affichage � la console d'informations d'avancement?
 verbose = True
@@ -58,6 +75,11 @@ gui = False
 # Cette partie n'a th�oriquement pas � �tre modifi�e
 
 import os
+import random
+import inspect
+import importlib
+import statistics
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from time import time
 from math import hypot
 
@@ -104,49 +126,77 @@ def validate(filename, length, path, duration, maxtime):
 
 
 
-if __name__ == '__main__':
-    # R�cup�ration des diff�rentes impl�mentations
-    # On met les diff�rentes fonctions ga_solve() dans un dictionnaire index� par le nom du module correpsondant
-    # On en profite pour �crire la ligne d'en-t�te du fichier de sortie
+def run(module, filename, maxtime, run_seed):
+    '''Execution d'un solveur sur un probleme, dans un processus du pool
+
+    retourne un tuple (longueur, duree, erreur), l'erreur etant une chaine vide si tout est OK
+    '''
+    ga_solve = importlib.import_module(module).ga_solve
+
+    # Le solveur recoit sa graine s'il l'accepte, sinon on initialise le module random
+    kwargs = {}
+    if run_seed is not None:
+        if 'seed' in inspect.signature(ga_solve).parameters:
+            kwargs['seed'] = run_seed
+        else:
+            random.seed(run_seed)
 
-    solvers = {}
+    try:
+        start = time()
+        length, path = ga_solve(filename, gui, maxtime, **kwargs)
+        duration = time()-start
+    except Exception as e:
+        return None, 0, "%r" % e
+    except SystemExit:
+        return None, 0, "tried to quit!"
 
-    outfile.write('Test;')
+    return length, duration, validate(filename, length, path, duration, maxtime)
 
-    for m in modules:
-        exec ("from %s import ga_solve" % m)
-        solvers[m] = ga_solve
-        outfile.write("%s;" % m)
+def summary(runs, maxtime):
+    '''Statistiques d'un cas sur les executions valides : nombre d'executions, moyenne,
+    mediane, meilleur, ecart-type, depassement maximal du temps imparti et erreurs'''
+    lengths = [length for length, duration, error in runs if not error]
+    overrun = max(duration - maxtime for length, duration, error in runs)
+    errors = " / ".join(error for length, duration, error in runs if error)
 
-    outfile.write('\n')
+    if not lengths:
+        return "%d;;;;;%.3f;%s;" % (len(runs), overrun, errors)
 
-    # Cette partie effectue les tests proprement dits
-    # et rapporte les r�sultats dans outfile
+    stddev = statistics.stdev(lengths) if len(lengths) > 1 else 0
+    return "%d;%.1f;%.1f;%.1f;%.1f;%.3f;%s;" % (len(runs), statistics.mean(lengths),
+        statistics.median(lengths), min(lengths), stddev, overrun, errors)
+
+if __name__ == '__main__':
+    outfile = open(outfilename, 'w') if outfilename else sys.stdout
 
+    # Chaque cas (module, probleme, temps) est repete, les executions sont reparties
+    # sur le pool de processus puis rassemblees par cas
+    cases = []
     for (filename, maxtime) in tests:
-        if verbose:
-            print ("--> %s, %d" % (filename, maxtime))
         # normalisation du nom de fichier (pour l'aspect multi-plateforme)
         filename = os.path.normcase(os.path.normpath(filename))
-        # �criture de l'en-t�te de ligne
-        outfile.write("%s (%ds);" % (filename, maxtime))
-        # Appel des solveurs proprement dits, v�rification et �criture des r�sultats
         for m in modules:
+            cases.append((m, filename, maxtime))
+
+    results = dict((case, []) for case in cases)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for case in cases:
+            for i in range(repetitions):
+                run_seed = None if seed is None else seed + i
+                futures[executor.submit(run, *case, run_seed)] = case
+
+        for future in as_completed(futures):
+            case = futures[future]
+            results[case].append(future.result())
             if verbose:
-                print ("## %s" % m)
-            try:
-                start = time()
-                length, path = solvers[m](filename, gui, maxtime)
-                duration = time()-start
-            except Exception as e:
-                    outfile.write("%r;" % e)
-            except SystemExit:
-                outfile.write("tried to quit!;")
-            else:
-                error = validate(filename, length, path, duration, maxtime)
-                if not error:
-                    outfile.write("%d;" % length)
-                else:
-                    outfile.write("%s;" % error)
-            outfile.flush()
+                print ("--> %s, %s, %d (%d/%d)" % (case + (len(results[case]), repetitions)))
+
+    # Ecriture des resultats, une ligne par cas
+    outfile.write('Test;Module;Runs;Mean;Median;Best;Stddev;Max overrun (s);Errors;\n')
+    for (m, filename, maxtime) in cases:
+        outfile.write("%s (%ds);%s;" % (filename, maxtime, m))
+        outfile.write(summary(results[(m, filename, maxtime)], maxtime))
         outfile.write('\n')
+    outfile.flush()
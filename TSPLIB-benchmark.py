@@ -0,0 +1,111 @@
+# coding: utf-8
+
+''' Mesure de l'écart à l'optimum du solveur DroxlerRoy sur des instances TSPLIB
+de 1000 à 20000 villes.
+
+Chaque instance est chargée une seule fois, puis résolue une fois avec Solver.iterate,
+qui produit chaque amélioration de la meilleure solution : on note l'instant de chaque
+amélioration depuis la fin du chargement, ce qui donne l'écart à l'optimum en fonction
+du temps. On rapporte aussi le temps de chargement et
+le temps jusqu'au premier chemin (population initiale), pour repérer les étapes qui
+ne passent pas à l'échelle.
+
+Les instances ne sont pas fournies : elles sont à télécharger depuis TSPLIB
+(http://comopt.ifi.uni-heidelberg.de/software/TSPLIB95/) et à décompresser dans
+le répertoire data/tsplib. Les instances absentes sont ignorées.
+'''
+
+# PARAMETRES
+# =========
+
+# Instances à tester, sous forme de triplets (<fichier>, <chemin optimal>, <optimum>) où
+# <chemin optimal> est le fichier .opt.tour de référence (None s'il n'existe pas) et
+# <optimum> la longueur optimale connue, utilisée si le chemin de référence est absent
+instances = (
+    ('data/tsplib/pr1002.tsp', 'data/tsplib/pr1002.opt.tour', 259045),
+    ('data/tsplib/pcb1173.tsp', None, 56892),
+    ('data/tsplib/d2103.tsp', None, 80450),
+    ('data/tsplib/pr2392.tsp', 'data/tsplib/pr2392.opt.tour', 378032),
+    ('data/tsplib/pcb3038.tsp', None, 137694),
+    ('data/tsplib/fnl4461.tsp', None, 182566),
+    ('data/tsplib/rl5915.tsp', None, 565530),
+    ('data/tsplib/pla7397.tsp', None, 23260728),
+    ('data/tsplib/rl11849.tsp', None, 923288),
+    ('data/tsplib/usa13509.tsp', None, 19982859),
+    ('data/tsplib/d15112.tsp', None, 1573084),
+    ('data/tsplib/d18512.tsp', None, 645238),
+)
+
+# Temps imparti à chaque résolution, en secondes
+maxtime = 60
+
+# Instants (en secondes) auxquels l'écart à l'optimum est rapporté
+checkpoints = (1, 5, 10, 30, 60)
+
+# Graine du générateur aléatoire, pour des exécutions reproductibles
+seed = 0
+
+# Options transmises au Solver, par exemple {'local_search': True}
+options = {}
+
+# Fichier dans lequel écrire les résultats (None pour la console)
+outfilename = 'benchmark.csv'
+
+# PROGRAMME
+# =========
+
+import os
+import sys
+from time import time
+
+import DroxlerRoy
+
+def optimum(cities_list, distances, tourfilename, known):
+    '''Longueur optimale : celle du chemin de référence s'il est disponible, avec les
+    distances de l'instance déjà chargée, sinon la valeur connue'''
+    if tourfilename and os.path.exists(tourfilename):
+        return DroxlerRoy.path_cost(cities_list, distances, DroxlerRoy.load_tour(tourfilename))
+    return known
+
+def run(cities_list, distances):
+    '''Résolution d'une instance déjà chargée : retourne la liste des améliorations
+    (instant, coût) depuis le lancement, le chargement n'étant pas décompté'''
+    trajectory = []
+    start = time()
+    solver = DroxlerRoy.Solver(cities_list, seed=seed, starting_time=start, distances=distances, **options)
+    for cost, path in solver.iterate(maxtime):
+        trajectory.append((time() - start, cost))
+
+    return trajectory
+
+def gap(trajectory, instant, best):
+    '''Écart relatif (en %) du meilleur coût trouvé avant instant, None si aucun'''
+    costs = [cost for elapsed, cost in trajectory if elapsed <= instant]
+    if not costs:
+        return None
+    return 100 * (costs[-1] - best) / best
+
+if __name__ == '__main__':
+    outfile = open(outfilename, 'w') if outfilename else sys.stdout
+    outfile.write('Instance;Villes;Optimum;Chargement (s);Premier chemin (s);%s;Ecart final (%%);Derniere amelioration (s);\n'
+                  % ';'.join('Ecart a %ds (%%)' % instant for instant in checkpoints if instant <= maxtime))
+
+    for filename, tourfilename, known in instances:
+        if not os.path.exists(filename):
+            print("--> %s absent, ignoré" % filename)
+            continue
+
+        print("--> %s" % filename)
+        start = time()
+        cities_list, distances = DroxlerRoy.load_instance(filename)
+        loading = time() - start
+        nb_cities = len(cities_list)
+
+        best = optimum(cities_list, distances, tourfilename, known)
+        trajectory = run(cities_list, distances)
+
+        gaps = [gap(trajectory, instant, best) for instant in checkpoints if instant <= maxtime]
+        outfile.write("%s;%d;%.0f;%.3f;%.3f;" % (filename, nb_cities, best, loading, trajectory[0][0]))
+        outfile.write(';'.join('' if value is None else '%.2f' % value for value in gaps))
+        outfile.write(";%.2f;%.3f;\n" % (gap(trajectory, trajectory[-1][0], best), trajectory[-1][0]))
+        outfile.flush()
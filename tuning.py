@@ -0,0 +1,142 @@
+# coding: utf-8
+
+''' Réglage des paramètres du solveur DroxlerRoy par classe de taille d'instance.
+
+Pour chaque classe, des configurations de population_size, mutation_rate,
+selection_rate et second_mutation_rate sont mises en concurrence par successive
+halving : toutes les configurations sont évaluées sur les instances de la classe, on
+garde le meilleur tiers, qui est réévalué avec trois fois plus de graines, et ainsi de
+suite jusqu'à ce qu'il n'en reste qu'une. En cas d'égalité, la configuration par défaut
+(la première) est préférée. Les configurations sont comparées par leur coût
+relatif (coût divisé par le meilleur coût obtenu sur la même instance avec la même graine),
+ce qui permet de mélanger des instances de tailles différentes.
+
+Les résolutions sont réparties sur un pool de processus. Les configurations retenues sont
+écrites dans un profil JSON que ga_solve charge avec l'option profile (voir
+DroxlerRoy.load_profile).
+'''
+
+# PARAMETRES
+# =========
+
+# Classes de taille : nombre maximal de villes de la classe, et instances sur lesquelles
+# la régler, sous forme de couples (<datafile>, <maxtime>)
+classes = {
+    20: (('data/pb010.txt', 1), ('data/pb015.txt', 1), ('data/pb020.txt', 1)),
+    100: (('data/pb050.txt', 2), ('data/pb100.txt', 2)),
+    500: (('data/pb200.txt', 5), ('data/pb300.txt', 5)),
+}
+
+# Valeurs possibles de chaque paramètre
+space = {
+    'population_size': (10, 20, 40, 80),
+    'mutation_rate': (20, 40, 60, 80),
+    'selection_rate': (40, 60, 80),
+    'second_mutation_rate': (40, 60, 80),
+}
+
+# Nombre de configurations au départ de chaque classe (dont la configuration par défaut)
+candidates = 27
+
+# Facteur de réduction : on garde 1/eta des configurations à chaque tour, et chaque
+# survivante est évaluée sur eta fois plus de graines au tour suivant
+eta = 3
+
+# Nombre de graines par instance au premier tour
+repetitions = 1
+
+# Graine du tirage des configurations
+seed = 0
+
+# Nombre de processus du pool (None pour un par coeur). Chaque résolution étant
+# limitée dans le temps, il vaut mieux ne pas dépasser le nombre de coeurs.
+workers = None
+
+# Fichier du profil écrit à la fin
+outfilename = 'profile.json'
+
+# affichage à la console d'informations d'avancement?
+verbose = True
+
+# PROGRAMME
+# =========
+
+import json
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+import DroxlerRoy
+
+def run(filename, maxtime, parameters, run_seed):
+    '''Résolution d'une instance avec une configuration, dans un processus du pool'''
+    cities_list, distances = DroxlerRoy.load_instance(filename)
+    solver = DroxlerRoy.Solver(cities_list, seed=run_seed, distances=distances, **parameters)
+    return solver.solve(maxtime, verbose=False)[0]
+
+def sample(rng, count):
+    '''Configurations de départ : la configuration par défaut, puis des configurations
+    distinctes tirées au hasard dans space'''
+    configurations = [dict((name, getattr(DroxlerRoy, name)) for name in space)]
+    combinations = 1
+    for values in space.values():
+        combinations *= len(values)
+
+    while len(configurations) < min(count, combinations):
+        configuration = dict((name, rng.choice(values)) for name, values in space.items())
+        if configuration not in configurations:
+            configurations.append(configuration)
+    return configurations
+
+def scores(configurations, costs):
+    '''Coût relatif moyen de chaque configuration : pour chaque (instance, graine), le coût
+    est divisé par le meilleur coût obtenu par l'une des configurations'''
+    runs = costs[0].keys()
+    best = dict((run, min(cost[run] for cost in costs)) for run in runs)
+    return [statistics.mean(cost[run] / best[run] for run in runs) for cost in costs]
+
+def halving(executor, instances, configurations):
+    '''Successive halving sur une classe : retourne la configuration retenue et son score'''
+    costs = [{} for _ in configurations]
+    seeds = list(range(repetitions))
+    next_seed = repetitions
+
+    while True:
+        futures = {}
+        for index, configuration in enumerate(configurations):
+            for filename, maxtime in instances:
+                for run_seed in seeds:
+                    future = executor.submit(run, filename, maxtime, configuration, run_seed)
+                    futures[future] = (index, (filename, run_seed))
+
+        for future, (index, key) in futures.items():
+            costs[index][key] = future.result()
+
+        ranking = sorted(zip(scores(configurations, costs), range(len(configurations))))
+        if verbose:
+            print("--> %d configurations, %d graines : meilleure %r (%.4f)"
+                  % (len(configurations), next_seed, configurations[ranking[0][1]], ranking[0][0]))
+
+        # La dernière survivante est retenue avec son score face aux autres
+        kept = [index for score, index in ranking[:max(len(configurations) // eta, 1)]]
+        if len(kept) == 1:
+            return configurations[kept[0]], ranking[0][0]
+
+        configurations = [configurations[index] for index in kept]
+        costs = [costs[index] for index in kept]
+        seeds = list(range(next_seed, next_seed + len(seeds) * eta))
+        next_seed += len(seeds)
+
+if __name__ == '__main__':
+    rng = random.Random(seed)
+    profile = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for bound in sorted(classes):
+            if verbose:
+                print("Classe <= %d villes" % bound)
+            configuration, score = halving(executor, classes[bound], sample(rng, candidates))
+            profile[str(bound)] = dict(configuration, score=round(score, 4))
+
+    with open(outfilename, 'w') as outfile:
+        json.dump(profile, outfile, indent=4, sort_keys=True)